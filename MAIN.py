@@ -1,16 +1,14 @@
 import streamlit as st
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
-import re
-import time
-import google.generativeai as genai
-import urllib.parse
-from datetime import datetime
-from selenium.webdriver.chrome.options import Options
-import random
+
+from pantip_listener.scraping import SORT_OPTIONS, MAX_SEARCH_POSTS, build_search_url
+from pantip_listener.cache import CACHE_TTL_SECONDS, get_cache, search_key, summary_key
+from pantip_listener.sampling import sample_fraction_text
+from pantip_listener.analysis import forum_title
+from pantip_listener.pipeline import make_model, search_checkpoint, run_search_job, run_summary_job
+from pantip_listener.ui import (
+    save_session_data, load_session_data, keep_session_alive,
+    submit_job, job_running, job_status_panel, job_table_sidebar, quota_sidebar, store_sidebar
+)
 
 # -------------------- Streamlit Page Config --------------------
 st.set_page_config(
@@ -20,6 +18,7 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 st.title("สรุปกระทู้ Pantip ด้วย AI")
+keep_session_alive()
 
 # -------------------- Session State Initialization --------------------
 if "api_key" not in st.session_state:
@@ -60,6 +59,10 @@ st.sidebar.markdown("## 🧠 ตัวเลือกเพิ่มเติม
 sentiment_toggle = st.sidebar.toggle(
     "📊 วิเคราะห์ความรู้สึกเบื้องต้น (Basic Sentiment Analysis)", value=True
 )
+aspect_hint_toggle = st.sidebar.toggle(
+    "🧭 ใช้ Aspect ที่ค้นพบจากคอมเมนต์เป็นแนวทางการสรุป", value=False,
+    help="จัดกลุ่มคอมเมนต์ในเครื่อง (ไม่ใช้ LLM) แล้วส่งหัวข้อที่พบให้ AI ใช้ประกอบการสรุป"
+)
 
 # Show model info
 model_info = {
@@ -73,9 +76,8 @@ st.sidebar.info(model_info[model_choice])
 
 # API Key Test
 if api_key:
-    genai.configure(api_key=api_key)
     try:
-        model = genai.GenerativeModel(model_choice)
+        model = make_model(api_key, model_choice)
         st.sidebar.markdown("---")
         st.sidebar.markdown("## 📊 API Status")
         st.sidebar.success(f"🤖 โมเดล: {model_choice}")
@@ -99,17 +101,16 @@ keyword = st.text_input(
 )
 st.session_state["keyword"] = keyword
 
-sort_options = ["เกี่ยวข้องมากที่สุด", "กระทู้ใหม่ที่สุด"]
 sort_option = st.selectbox(
     "เลือกวิธีเรียงลำดับ (Sort by)",
-    options=sort_options,
-    index=sort_options.index(st.session_state.get("sort_option", "กระทู้ใหม่ที่สุด")),
+    options=SORT_OPTIONS,
+    index=SORT_OPTIONS.index(st.session_state.get("sort_option", "กระทู้ใหม่ที่สุด")),
 )
 st.session_state["sort_option"] = sort_option
 
 max_posts = st.number_input(
     "จำนวนกระทู้สูงสุดที่ต้องการ (Max posts)",
-    min_value=1, max_value=30,
+    min_value=1, max_value=MAX_SEARCH_POSTS,
     value=st.session_state.get("max_posts", 15),
     step=1
 )
@@ -122,369 +123,248 @@ date_filter = st.date_input(
 )
 st.session_state["date_filter"] = date_filter
 
+sampling_mode = st.toggle(
+    "🎯 โหมดสุ่มตัวอย่างคอมเมนต์ (จำกัดจำนวนคอมเมนต์ต่อการค้นหา)",
+    value=st.session_state.get("sampling_mode", False),
+    help="แบ่งโควต้าคอมเมนต์ให้ทุกกระทู้ตามขนาดและกระจายตามลำดับคอมเมนต์ "
+         "กระทู้ใหญ่จะหยุดโหลดคอมเมนต์เพิ่มเมื่อได้ครบโควต้า ทำให้เวลาและค่า Token คาดการณ์ได้"
+)
+st.session_state["sampling_mode"] = sampling_mode
+comment_budget = None
+if sampling_mode:
+    comment_budget = st.number_input(
+        "จำนวนคอมเมนต์สูงสุดต่อการค้นหา (Comment budget)",
+        min_value=20, max_value=5000,
+        value=st.session_state.get("comment_budget", 300),
+        step=20
+    )
+    st.session_state["comment_budget"] = comment_budget
+
 # -------------------- Build Pantip Search URL --------------------
-keyword_encoded = urllib.parse.quote_plus(keyword)
-if sort_option == "กระทู้ใหม่ที่สุด":
-    search_url = f"https://pantip.com/search?q={keyword_encoded}&timebias=true"
-else:
-    search_url = f"https://pantip.com/search?q={keyword_encoded}"
+search_url = build_search_url(keyword, sort_option)
 
 st.write(f"Pantip Search URL: [คลิกที่นี่]({search_url})")
 
-# -------------------- Scrape Pantip Threads --------------------
-def parse_thai_date(date_str):
-    """
-    Parse Thai date string like '21 มิ.ย. 67' to datetime object.
-    Returns None if parsing fails.
-    """
-    try:
-        thai_months = {
-            'ม.ค.': 1, 'ก.พ.': 2, 'มี.ค.': 3, 'เม.ย.': 4, 'พ.ค.': 5, 'มิ.ย.': 6,
-            'ก.ค.': 7, 'ส.ค.': 8, 'ก.ย.': 9, 'ต.ค.': 10, 'พ.ย.': 11, 'ธ.ค.': 12
-        }
-        parts = date_str.strip().split()
-        if len(parts) != 3:
-            return None
-        day = int(parts[0])
-        month = thai_months.get(parts[1])
-        year = int(parts[2])
-        if year < 100:
-            year += 2500
-        year -= 543
-        if month is None:
-            return None
-        return datetime(year, month, day)
-    except Exception:
-        return None
-
 # -------------------- Main Button: Summarize Pantip Threads --------------------
-if st.button("สรุปกระทู้ Pantip", disabled=not api_key or not keyword):
+def format_usage(usage):
+    return (f"🔢 Token ที่ใช้: {usage['total']} "
+            f"(Input: {usage['input']}, Output: {usage['output']})")
+
+def attach_search_result(job):
+    result = job.result
+    all_forums_text = result["all_forums_text"]
+    if not all_forums_text:
+        return ("warning", "❌ ไม่พบกระทู้ที่ตรงกับเงื่อนไขที่ค้นหา")
+    save_session_data("all_forums_text", all_forums_text)
+    save_session_data("discovered_aspects", None)
+    st.session_state["sample_info"] = result["sample_info"]
+    st.session_state.pop("selected_forums", None)
+    if result["summary_error"]:
+        return ("error", f"✅ ดึงข้อมูลได้ {len(all_forums_text)} กระทู้ แต่เกิดข้อผิดพลาดในการสรุปผล: {result['summary_error']}")
+    st.session_state["llm_summary"] = result["llm_summary"]
+    message = f"✅ สรุปเสร็จสิ้น! ได้ข้อมูลจาก {len(all_forums_text)} กระทู้"
+    if result["cache_age"] is not None:
+        message += f"  \n♻️ ใช้ผลการค้นหาจากแคช (ดึงข้อมูลเมื่อ {result['cache_age'] / 60:.0f} นาทีที่แล้ว)"
+    if result["summary_cached"]:
+        message += "  \n♻️ ใช้สรุปจากแคช (ไม่ใช้ Token เพิ่ม)"
+    elif result["usage"]:
+        message += "  \n" + format_usage(result["usage"])
+    if result["sample_info"]:
+        message += "  \n" + sample_fraction_text(result["sample_info"])
+    return ("success", message)
+
+search_running = job_running("search_job_id")
+
+# Offer to resume a search that failed or was interrupted
+search_resume = None
+if keyword and not search_running:
+    search_resume = search_checkpoint(search_url, max_posts, date_filter, comment_budget)
+if search_resume is not None and search_resume.exists():
+    st.info(f"♻️ พบงานค้นหานี้ที่ยังไม่เสร็จ (บันทึกไว้แล้ว {search_resume.saved_thread_count()} กระทู้) "
+            "กดปุ่มด้านล่างเพื่อทำต่อจากจุดเดิม")
+    if st.button("🗑️ ล้างข้อมูลที่บันทึกไว้และเริ่มใหม่"):
+        search_resume.clear()
+        st.rerun()
+
+# Identical searches from any session share cached results and running jobs
+search_cache_key = search_key(keyword, sort_option, max_posts, date_filter, comment_budget)
+search_job_key = summary_key(search_cache_key, model_choice, sentiment_toggle, aspect_hint_toggle)
+refresh_cache = st.checkbox(
+    "🔄 ดึงข้อมูลใหม่ (ไม่ใช้ผลที่แคชไว้)",
+    value=False,
+    help=f"ผลการค้นหาเดียวกันจะถูกแคชไว้ {CACHE_TTL_SECONDS // 60} นาทีและใช้ร่วมกันทุกผู้ใช้"
+)
+if st.button("สรุปกระทู้ Pantip", disabled=not api_key or not keyword or search_running):
     if not api_key:
         st.error("❌ กรุณาใส่ API Key ก่อนใช้งาน")
     elif not keyword:
         st.error("❌ กรุณาใส่คีย์เวิร์ดที่ต้องการค้นหา")
     else:
         st.info(f"คุณเลือก {max_posts} กระทู้ | Keyword: {keyword} | Sort: {sort_option}")
+        if refresh_cache:
+            get_cache().invalidate(search_cache_key)
+            get_cache().invalidate(search_job_key)
+        submit_job(
+            "search_job_id", "search", run_search_job,
+            api_key, model_choice, search_url, max_posts, date_filter, sentiment_toggle,
+            cache_key=search_cache_key,
+            use_aspect_hint=aspect_hint_toggle,
+            comment_budget=comment_budget,
+            label=f"ค้นหา: {keyword}",
+            dedupe_key=search_job_key
+        )
 
-        # --- Start Selenium Browser ---
-        with st.spinner("🔍 กำลังเปิดเบราว์เซอร์และค้นหา..."):
-            chrome_options = Options()
-            chrome_options.add_argument("--headless")
-            chrome_options.add_argument("--disable-gpu")
-            chrome_options.add_argument("--no-sandbox")
-            chrome_options.add_argument("--disable-dev-shm-usage")
-            chrome_options.add_argument("--disable-logging")
-            chrome_options.add_argument("--log-level=3")
-            chrome_options.add_argument("--disable-extensions")
-            chrome_options.add_argument("--disable-web-security")
-            chrome_options.add_argument("--disable-images")
-            chrome_options.add_argument("--disable-plugins")
-            chrome_options.add_argument("--disable-software-rasterizer")
-            chrome_options.add_argument("--disable-background-timer-throttling")
-            chrome_options.add_argument("--disable-backgrounding-occluded-windows")
-            chrome_options.add_argument("--disable-renderer-backgrounding")
-
-            driver = webdriver.Chrome(options=chrome_options)
-            driver.get(search_url)
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "li.pt-list-item h2 a"))
-            )
-
-        # --- Load More Results if Needed ---
-        with st.spinner("📜 กำลังโหลดผลการค้นหาเพิ่มเติม..."):
-            max_tries = 10
-            for _ in range(max_tries):
-                threads = driver.find_elements(By.CSS_SELECTOR, "li.pt-list-item h2 a")
-                if len(threads) >= max_posts:
-                    break
-                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(1)
-
-        # --- Parse Search Results ---
-        with st.spinner("🔗 กำลังประมวลผลลิงก์กระทู้..."):
-            soup = BeautifulSoup(driver.page_source, "html.parser")
-            threads = soup.select("li.pt-list-item h2 a")[:max_posts]
-            thread_urls = [t['href'] if t['href'].startswith("http") else "https://pantip.com" + t['href'] for t in threads]
-
-            all_forums_text = []
-
-            # Filter by date if needed
-            if date_filter:
-                filtered_urls = []
-                date_elements = soup.select("li.pt-list-item .pt-sm-toggle-date-hide")
-                for i, url in enumerate(thread_urls):
-                    if i < len(date_elements):
-                        date_str = date_elements[i].get_text(strip=True)
-                        post_date = parse_thai_date(date_str)
-                        if post_date and post_date.date() >= date_filter:
-                            filtered_urls.append(url)
-                thread_urls = filtered_urls
-                st.info(f"📅 กรองแล้ว: เหลือ {len(thread_urls)} กระทู้หลังวันที่ {date_filter}")
-            else:
-                st.info(f"📊 ไม่กรองตามวันที่: รวม {len(thread_urls)} กระทู้")
-
-            if not thread_urls:
-                st.warning("❌ ไม่พบกระทู้ที่ตรงกับเงื่อนไขที่ค้นหา")
-                st.stop()
-
-        # --- Scrape Each Thread ---
-        st.info("📝 กำลังดึงข้อมูลเนื้อหากระทู้...")
-        progress_bar = st.progress(0)
-        status_text = st.empty()
-
-        for i, url in enumerate(thread_urls):
-            progress = (i + 1) / len(thread_urls)
-            progress_bar.progress(progress)
-            status_text.text(f"กำลังดึงข้อมูลกระทู้ที่ {i+1}/{len(thread_urls)}")
-            try:
-                driver.get(url)
-                WebDriverWait(driver, 10).until(
-                    EC.presence_of_element_located((By.CLASS_NAME, "display-post-story"))
-                )
-                # Click all "see more replies" buttons
-                for _ in range(3):
-                    see_more_buttons = driver.find_elements(By.CSS_SELECTOR, "a.reply.see-more")
-                    if not see_more_buttons:
-                        break
-                    for btn in see_more_buttons:
-                        driver.execute_script("arguments[0].click();", btn)
-                        time.sleep(0.1)
-                try:
-                    WebDriverWait(driver, 5).until(
-                        lambda d: len(d.find_elements(By.CLASS_NAME, "display-post-story")) > 1
-                    )
-                except Exception:
-                    pass
-                time.sleep(1)
-                soup = BeautifulSoup(driver.page_source, "html.parser")
-                header = soup.find("h2", {"class": "display-post-title"})
-                forum_texts = []
-                if header:
-                    forum_texts.append(f"หัวข้อ : {header.text}")
-                comments = soup.find_all("div", {"class": "display-post-story"})
-                for idx, comment in enumerate(comments, start=0):
-                    text = comment.get_text(separator=" ", strip=True)
-                    text = re.sub(r'\s+', ' ', text)
-                    label = f"เนื้อหา : {text}" if idx == 0 else f"คอมเมนต์ที่ {idx} : {text}"
-                    forum_texts.append(label)
-                all_forums_text.append("\n".join(forum_texts))
-                st.session_state["all_forums_text"] = all_forums_text
-                time.sleep(0.5)
-                time.sleep(0.2)
-                time.sleep(random.uniform(1, 2))
-            except Exception as e:
-                st.warning(f"Error scraping {url}: {e}")
-                continue
-
-        progress_bar.empty()
-        status_text.empty()
-
-        with st.spinner("🔒 กำลังปิดเบราว์เซอร์..."):
-            driver.quit()
-
-        st.success(f"✅ ดึงข้อมูลเสร็จสิ้น! ได้ข้อมูลจาก {len(all_forums_text)} กระทู้")
-
-        # --- Prepare Data for AI ---
-        with st.spinner("📋 กำลังเตรียมข้อมูลสำหรับ AI..."):
-            input_for_llm = "\n\n".join(all_forums_text)
-            st.session_state["input_for_llm"] = input_for_llm
-            with st.expander("🔎 ข้อความที่นำเข้า (คลิกเพื่อดู/ซ่อน)", expanded=False):
-                st.text_area(
-                    "ข้อความที่นำเข้า",
-                    st.session_state["input_for_llm"],
-                    height=300,
-                    key="input_for_llm_preview",
-                    disabled=True
-                )
-
-            model = genai.GenerativeModel(model_choice)
-            prompt_parts = [
-                "You are a LLM-powered social-listening application, tasked to summarize Pantip posts and comments into aspects in THAI LANGUAGE.",
-                "Here are the texts you need to summarize:",
-                st.session_state["input_for_llm"],
-                "Summarize the information into each aspect in this format:",
-                "**สรุปโดยย่อ**: {summary}",
-                "**{aspect1}**: {aspect1_summary}",
-                "**{aspect2}**: {aspect2_summary}",
-                "and so on...",
-                "Aspect is not the same as thread, it is what have been discussed.",
-                "You must response in the format above.",
-                "You must response in THAI LANGUAGE only.",
-                "Every paragraph MUST have a new line between them"
-            ]
-            if sentiment_toggle:
-                prompt_parts.insert(-2, "For each aspect, add a new line below the summary in this format:\n**อารมณ์ (Sentiment)**: <label> (positive😄, neutral😐, or negative😡)")
-            prompt = "\n".join(prompt_parts)
-
-        # --- AI Summarization ---
-        with st.spinner("🤖 กำลังสรุปผลด้วย Gemini AI... กรุณารอสักครู่"):
-            try:
-                response = model.generate_content(prompt)
-                st.success("✅ สรุปเสร็จสิ้น!")
-                if hasattr(response, 'usage_metadata'):
-                    st.info(f"🔢 Token ที่ใช้: {response.usage_metadata.total_token_count} "
-                            f"(Input: {response.usage_metadata.prompt_token_count}, "
-                            f"Output: {response.usage_metadata.candidates_token_count})")
-                st.session_state["llm_summary"] = response.text
-                st.rerun()
-            except Exception as e:
-                st.error(f"❌ เกิดข้อผิดพลาดในการสรุปผล: {e}")
+job_status_panel("search_job_id", attach_search_result)
 
 # -------------------- Show Latest Summary --------------------
 if "llm_summary" in st.session_state and st.session_state["llm_summary"]:
     st.markdown("---")
     st.markdown("### 📊 สรุปจากโมเดลภาษา")
+    if st.session_state.get("sample_info"):
+        st.caption(sample_fraction_text(st.session_state["sample_info"]))
     st.markdown(st.session_state["llm_summary"])
 
 # -------------------- Show Input Preview --------------------
-if "input_for_llm" in st.session_state:
+# One decompressed copy of the scraped threads per rerun; the canonical copy lives in the session store
+all_forums_text = load_session_data("all_forums_text", [])
+
+if all_forums_text:
     st.markdown("---")
     with st.expander("🔎 ข้อความที่นำเข้า (คลิกเพื่อดู/ซ่อน)", expanded=False):
-        st.text_area(
-            "ข้อความที่นำเข้า",
-            st.session_state["input_for_llm"],
-            height=300,
-            key="input_for_llm_preview",
-            disabled=False
-        )
+        st.code("\n\n".join(all_forums_text), language=None)
 
 # -------------------- Regenerate Summary with Selected Threads --------------------
-if "input_for_llm" in st.session_state:
+if all_forums_text:
     st.markdown("---")
     st.markdown("### 🎯 เลือกกระทู้ที่ต้องการวิเคราะห์")
-    if "all_forums_text" in st.session_state and st.session_state["all_forums_text"]:
-        if len(st.session_state.get("selected_forums", [])) != len(st.session_state["all_forums_text"]):
-            st.session_state["selected_forums"] = [True] * len(st.session_state["all_forums_text"])
-
-        forum_options = []
-        for i, forum_text in enumerate(st.session_state["all_forums_text"]):
-            lines = forum_text.split('\n')
-            title = lines[0] if lines else f"กระทู้ที่ {i+1}"
-            if title.startswith("หัวข้อ : "):
-                title = title.replace("หัวข้อ : ", "", 1)
-            if len(title) > 60:
-                title = title[:60] + "..."
-            forum_options.append(f"{i+1}. {title}")
-
-        col1, col2 = st.columns([1, 1])
-        with col1:
-            if st.button("✅ เลือกทั้งหมด", key="select_all"):
-                st.session_state["selected_forums"] = [True] * len(st.session_state["all_forums_text"])
-                st.rerun()
-        with col2:
-            if st.button("❌ ยกเลิกทั้งหมด", key="deselect_all"):
-                st.session_state["selected_forums"] = [False] * len(st.session_state["all_forums_text"])
-                st.rerun()
-
-        st.markdown("**เลือกกระทู้ที่ต้องการรวมในการวิเคราะห์:**")
-        currently_selected = [i for i, selected in enumerate(st.session_state.get("selected_forums", [])) if selected]
-        currently_selected_options = [forum_options[i] for i in currently_selected]
-
-        def update_selected_forums():
-            selected_options = st.session_state["forum_multiselect"]
-            selected_forums = [False] * len(st.session_state["all_forums_text"])
-            for option in selected_options:
-                index = int(option.split('.')[0]) - 1
-                selected_forums[index] = True
-            st.session_state["selected_forums"] = selected_forums
-
-        selected_options = st.multiselect(
-            "เลือกกระทู้:",
-            options=forum_options,
-            default=currently_selected_options,
-            key="forum_multiselect",
-            help="เลือกกระทู้ที่ต้องการนำมาวิเคราะห์",
-            on_change=update_selected_forums
-        )
-
-        st.session_state["selected_forums"] = [False] * len(st.session_state["all_forums_text"])
+    if len(st.session_state.get("selected_forums", [])) != len(all_forums_text):
+        st.session_state["selected_forums"] = [True] * len(all_forums_text)
+
+    forum_options = []
+    for i, forum_text in enumerate(all_forums_text):
+        title = forum_title(forum_text) or f"กระทู้ที่ {i+1}"
+        if len(title) > 60:
+            title = title[:60] + "..."
+        forum_options.append(f"{i+1}. {title}")
+
+    col1, col2 = st.columns([1, 1])
+    with col1:
+        if st.button("✅ เลือกทั้งหมด", key="select_all"):
+            st.session_state["selected_forums"] = [True] * len(all_forums_text)
+            st.rerun()
+    with col2:
+        if st.button("❌ ยกเลิกทั้งหมด", key="deselect_all"):
+            st.session_state["selected_forums"] = [False] * len(all_forums_text)
+            st.rerun()
+
+    st.markdown("**เลือกกระทู้ที่ต้องการรวมในการวิเคราะห์:**")
+    currently_selected = [i for i, selected in enumerate(st.session_state.get("selected_forums", [])) if selected]
+    currently_selected_options = [forum_options[i] for i in currently_selected]
+
+    def update_selected_forums():
+        selected_options = st.session_state["forum_multiselect"]
+        selected_forums = [False] * len(all_forums_text)
         for option in selected_options:
             index = int(option.split('.')[0]) - 1
-            st.session_state["selected_forums"][index] = True
+            selected_forums[index] = True
+        st.session_state["selected_forums"] = selected_forums
+
+    selected_options = st.multiselect(
+        "เลือกกระทู้:",
+        options=forum_options,
+        default=currently_selected_options,
+        key="forum_multiselect",
+        help="เลือกกระทู้ที่ต้องการนำมาวิเคราะห์",
+        on_change=update_selected_forums
+    )
 
-        selected_count = sum(st.session_state["selected_forums"])
-        total_count = len(st.session_state["all_forums_text"])
+    st.session_state["selected_forums"] = [False] * len(all_forums_text)
+    for option in selected_options:
+        index = int(option.split('.')[0]) - 1
+        st.session_state["selected_forums"][index] = True
 
-        if selected_count == 0:
-            st.warning("⚠️ กรุณาเลือกอย่างน้อย 1 กระทู้")
+    selected_count = sum(st.session_state["selected_forums"])
+    total_count = len(all_forums_text)
+
+    if selected_count == 0:
+        st.warning("⚠️ กรุณาเลือกอย่างน้อย 1 กระทู้")
+    else:
+        st.info(f"📊 เลือกแล้ว: {selected_count}/{total_count} กระทู้")
+        if st.toggle("🔍 แสดงตัวอย่างเนื้อหาที่เลือก", value=False):
+            for i, forum_text in enumerate(all_forums_text):
+                if st.session_state["selected_forums"][i]:
+                    title = forum_title(forum_text)
+                    preview = forum_text
+                    with st.expander(f"📄{i+1}. {title}", expanded=False):
+                        st.text(preview)
+
+    def attach_summary_result(job):
+        st.session_state["llm_summary"] = job.result["llm_summary"]
+        message = f"✅ สรุปเสร็จสิ้น! (จากกระทู้ที่เลือก {job.result['thread_count']} กระทู้)"
+        partials = job.result["partials"]
+        if partials["direct"]:
+            message += "  \n🧩 สรุปในครั้งเดียว (หากสรุปใหม่อีกครั้งจะเก็บสรุปรายกระทู้ไว้ใช้ซ้ำ)"
         else:
-            st.info(f"📊 เลือกแล้ว: {selected_count}/{total_count} กระทู้")
-            if st.toggle("🔍 แสดงตัวอย่างเนื้อหาที่เลือก", value=False):
-                for i, forum_text in enumerate(st.session_state["all_forums_text"]):
-                    if st.session_state["selected_forums"][i]:
-                        lines = forum_text.split('\n')
-                        title = lines[0]
-                        if title.startswith("หัวข้อ : "):
-                            title = title.replace("หัวข้อ : ", "", 1)
-                        preview = forum_text
-                        with st.expander(f"📄{i+1}. {title}", expanded=False):
-                            st.text(preview)
+            message += (f"  \n🧩 ใช้สรุปรายกระทู้ที่เก็บไว้ {partials['reused']} กระทู้, "
+                        f"สรุปใหม่ {partials['new']} กระทู้")
+        if partials["merge_cached"]:
+            message += " (ใช้ผลรวมที่เคยสรุปไว้)"
+        if job.result["usage"]:
+            message += "  \n" + format_usage(job.result["usage"])
+        return ("success", message)
 
     regenerate_disabled = (
-        not st.session_state.get("all_forums_text") or 
-        not any(st.session_state.get("selected_forums", []))
+        not all_forums_text or
+        not any(st.session_state.get("selected_forums", [])) or
+        job_running("summary_job_id")
     )
 
     if st.button("🔄 สรุปใหม่ด้วย AI (ใช้กระทู้ที่เลือก)", disabled=regenerate_disabled):
-        if not st.session_state.get("all_forums_text"):
+        if not all_forums_text:
             st.error("❌ ไม่พบข้อมูลกระทู้ กรุณาดึงข้อมูลใหม่")
         elif not any(st.session_state.get("selected_forums", [])):
             st.error("❌ กรุณาเลือกอย่างน้อย 1 กระทู้")
         else:
-            with st.spinner("🤖 กำลังสรุปผลด้วย Gemini AI... กรุณารอสักครู่"):
-                try:
-                    selected_forums_text = [
-                        forum_text for i, forum_text in enumerate(st.session_state["all_forums_text"])
-                        if st.session_state["selected_forums"][i]
-                    ]
-                    filtered_input_for_llm = "\n\n".join(selected_forums_text)
-                    selected_count = len(selected_forums_text)
-                    st.info(f"📊 กำลังวิเคราะห์ {selected_count} กระทู้ที่เลือก")
-                    with st.expander("🔎 ข้อความที่นำเข้า (กระทู้ที่เลือก)", expanded=False):
-                        st.text_area("ข้อความที่นำเข้า", filtered_input_for_llm, height=300, key="filtered_input")
-                    model = genai.GenerativeModel(model_choice)
-                    prompt_parts = [
-                        "You are a LLM-powered social-listening application, tasked to summarize Pantip posts and comments into aspects in THAI LANGUAGE.",
-                        "Here are the texts you need to summarize:",
-                        filtered_input_for_llm,
-                        "Summarize the information into each aspect in this format:",
-                        "**สรุปโดยย่อ**: {summary}",
-                        "**{aspect1}**: {aspect1_summary}",
-                        "**{aspect2}**: {aspect2_summary}",
-                        "and so on...",
-                        "Aspect is not the same as thread, it is what have been discussed.",
-                        "You must response in the format above.",
-                        "You must response in THAI LANGUAGE only.",
-                        "Every paragraph MUST have a new line between them"
-                    ]
-                    if sentiment_toggle:
-                        prompt_parts.insert(-2, "For each aspect, add a new line below the summary in this format:\n**อารมณ์ (Sentiment)**: <label> (positive😄, neutral😐, or negative😡)")
-                    prompt = "\n".join(prompt_parts)
-                    response = model.generate_content(prompt)
-                    st.success(f"✅ สรุปเสร็จสิ้น! (จากกระทู้ที่เลือก {selected_count} กระทู้)")
-                    if hasattr(response, 'usage_metadata'):
-                        st.info(f"🔢 Token ที่ใช้: {response.usage_metadata.total_token_count} "
-                                f"(Input: {response.usage_metadata.prompt_token_count}, "
-                                f"Output: {response.usage_metadata.candidates_token_count})")
-                    st.session_state["llm_summary"] = response.text
-                    st.rerun()
-                except Exception as e:
-                    st.error(f"❌ เกิดข้อผิดพลาดในการสรุปผล: {e}")
+            selected_forums_text = [
+                forum_text for i, forum_text in enumerate(all_forums_text)
+                if st.session_state["selected_forums"][i]
+            ]
+            filtered_input_for_llm = "\n\n".join(selected_forums_text)
+            selected_count = len(selected_forums_text)
+            st.info(f"📊 กำลังวิเคราะห์ {selected_count} กระทู้ที่เลือก")
+            with st.expander("🔎 ข้อความที่นำเข้า (กระทู้ที่เลือก)", expanded=False):
+                st.code(filtered_input_for_llm, language=None)
+            submit_job(
+                "summary_job_id", "summary", run_summary_job,
+                api_key, model_choice, selected_forums_text, sentiment_toggle, aspect_hint_toggle,
+                label=f"สรุปใหม่ {selected_count} กระทู้"
+            )
+
+    job_status_panel("summary_job_id", attach_summary_result)
+
+# -------------------- Sidebar: Background Jobs --------------------
+job_table_sidebar()
+quota_sidebar(api_key, model_choice)
+store_sidebar()
 
 # -------------------- Sidebar Instructions --------------------
 st.sidebar.markdown("---")
 st.sidebar.markdown("## 📖 วิธีการใช้งาน")
-st.sidebar.markdown("1. รับ API Key จาก [Google AI Studio](https://makersuite.google.com/app/apikey)")
-st.sidebar.markdown("2. ใส่ API Key ในช่องด้านบน")
-st.sidebar.markdown("3. ใส่คีย์เวิร์ดที่ต้องการค้นหา")
-st.sidebar.markdown("4. คลิกปุ่ม 'สรุปกระทู้ Pantip'")
+st.sidebar.markdown(
+    "1. รับ API Key จาก [Google AI Studio](https://makersuite.google.com/app/apikey)\n"
+    "2. ใส่ API Key ในช่องด้านบน\n"
+    "3. ใส่คีย์เวิร์ดที่ต้องการค้นหา\n"
+    "4. คลิกปุ่ม 'สรุปกระทู้ Pantip'"
+)
 
 st.sidebar.markdown("---")
 st.sidebar.markdown("## ℹ️ ข้อมูลเพิ่มเติม")
-st.sidebar.markdown("- แอปนี้ใช้สำหรับวิเคราะห์ความเห็นใน Pantip")
-st.sidebar.markdown("- ข้อมูลจะถูกสรุปด้วย AI")
-st.sidebar.markdown("- API Key จะไม่ถูกเก็บบันทึก")
-st.sidebar.markdown("- เช็คโควต้าได้ที่ [Google AI Studio](https://makersuite.google.com/app/apikey)")
+st.sidebar.markdown(
+    "- แอปนี้ใช้สำหรับวิเคราะห์ความเห็นใน Pantip\n"
+    "- ข้อมูลจะถูกสรุปด้วย AI\n"
+    "- API Key จะไม่ถูกเก็บบันทึก\n"
+    "- เช็คโควต้าได้ที่ [Google AI Studio](https://makersuite.google.com/app/apikey)"
+)
 
 # Store latest user input in session state for other pages
 keyword = st.session_state["keyword"]
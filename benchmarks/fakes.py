@@ -0,0 +1,143 @@
+"""
+Deterministic stand-ins for Chrome and Gemini used by the benchmark suite.
+"""
+import re
+import json
+import time
+import random
+import zlib
+
+from selenium.common.exceptions import NoSuchElementException
+
+# Rough substring markers for the selectors the scraper waits on
+SELECTOR_MARKERS = {
+    "li.pt-list-item h2 a": 'class="pt-list-item"',
+    "display-post-story": 'class="display-post-story"',
+    "a.reply.see-more": 'class="reply see-more"',
+}
+
+class FakeElement:
+    def __init__(self, text):
+        self.text = text
+
+class FakeDriver:
+    """
+    Serves recorded pages by URL, mimicking the parts of WebDriver the scraper uses.
+    A page may be a list of snapshots: clicking "see more replies" moves to the next one.
+    """
+
+    def __init__(self, pages, default=None):
+        self.pages = pages
+        self.default = default
+        self.page_source = ""
+        self.current_url = ""
+        self.requests = 0
+        self.clicks = 0
+        self._snapshots = []
+
+    def get(self, url):
+        self.requests += 1
+        self.current_url = url
+        page = self.pages.get(url, self.default) or ""
+        self._snapshots = list(page) if isinstance(page, (list, tuple)) else [page]
+        self.page_source = self._snapshots[0]
+
+    def find_elements(self, by, value):
+        marker = SELECTOR_MARKERS.get(value)
+        if marker is None:
+            return []
+        # Elements only carry their text, read up to the closing tag of the marked element
+        pattern = re.escape(marker) + r"[^>]*>([^<]*)"
+        return [FakeElement(text) for text in re.findall(pattern, self.page_source)]
+
+    def find_element(self, by, value):
+        elements = self.find_elements(by, value)
+        if not elements:
+            raise NoSuchElementException(value)
+        return elements[0]
+
+    def execute_script(self, script, *args):
+        if "click" in script and len(self._snapshots) > 1:
+            self.clicks += 1
+            self._snapshots.pop(0)
+            self.page_source = self._snapshots[0]
+        return None
+
+    def quit(self):
+        self.page_source = ""
+        self._snapshots = []
+
+class _Usage:
+    def __init__(self, prompt_tokens, output_tokens):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = output_tokens
+        self.total_token_count = prompt_tokens + output_tokens
+
+class StubResponse:
+    def __init__(self, text, prompt):
+        self.text = text
+        self.usage_metadata = _Usage(len(prompt) // 4, len(text) // 4)
+
+class StubRateLimitError(Exception):
+    """Looks like google.api_core.exceptions.ResourceExhausted to the scheduler."""
+    code = 429
+
+class StubGenerativeModel:
+    """
+    Drop-in for genai.GenerativeModel that answers instantly (plus latency seconds)
+    with summaries or classification JSON. A drop_rate fraction of classification
+    records is emitted malformed, to exercise the re-request path, and a
+    fail_rate fraction of calls raises a 429, as do the first fail_first calls.
+    """
+
+    SENTIMENTS = ["positive", "neutral", "negative"]
+
+    def __init__(self, model_name="stub", latency=0.0, drop_rate=0.0, fail_rate=0.0, seed=0, fail_first=0):
+        self.model_name = model_name
+        self.latency = latency
+        self.drop_rate = drop_rate
+        self.fail_rate = fail_rate
+        self.fail_first = fail_first
+        self.rng = random.Random(seed)
+        self.calls = 0
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.calls <= self.fail_first or (self.fail_rate and self.rng.random() < self.fail_rate):
+            raise StubRateLimitError("429 Resource has been exhausted (e.g. check quota).")
+        if "Comments:\n" in prompt:
+            return StubResponse(self._classify(prompt), prompt)
+        return StubResponse(self._summarize(prompt), prompt)
+
+    def _classify(self, prompt):
+        match = re.search(r"เลือกจาก: (.*?)\) ที่เกี่ยวข้อง", prompt)
+        aspects = match.group(1).split(", ") if match else ["ไม่ถูกจัดประเภท"]
+        comments = prompt.split("Comments:\n", 1)[1]
+        records = []
+        for line in comments.splitlines():
+            m = re.match(r"(\d+)\. (.*)", line)
+            if not m:
+                continue
+            h = zlib.crc32(m.group(2).encode("utf-8"))
+            record = json.dumps({
+                "index": int(m.group(1)),
+                "aspect": aspects[h % len(aspects)],
+                "sentiment": self.SENTIMENTS[h % 3],
+            }, ensure_ascii=False)
+            if zlib.crc32(f"{self.calls}:{line}".encode("utf-8")) % 1000 < self.drop_rate * 1000:
+                record = record[:len(record) // 2]
+            records.append(record)
+        return "[" + ", ".join(records) + "]"
+
+    def _summarize(self, prompt):
+        return "\n\n".join([
+            "**สรุปโดยย่อ**: ผู้ใช้พูดถึงการเดินทางด้วยรถไฟฟ้า",
+            "**ความตรงต่อเวลา**: รถมาช้าในชั่วโมงเร่งด่วน",
+            "**อารมณ์ (Sentiment)**: negative😡",
+            "**ราคาค่าโดยสาร**: หลายคนมองว่าแพง",
+            "**อารมณ์ (Sentiment)**: negative😡",
+            "**ความสะอาด**: สถานีสะอาด",
+            "**อารมณ์ (Sentiment)**: positive😄",
+        ])
@@ -0,0 +1,113 @@
+"""
+Offline Pantip page fixtures for the benchmark suite.
+
+Recorded pages can be dropped into benchmarks/fixtures/ (search.html and
+thread_<name>.html); anything missing is generated with the same markup the
+scraper selects on, so the suite always runs without network.
+"""
+import os
+import random
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+# Replies per thread for each size class
+THREAD_SIZES = {"small": 12, "medium": 90, "large": 600}
+
+THAI_MONTHS = ["ม.ค.", "ก.พ.", "มี.ค.", "เม.ย.", "พ.ค.", "มิ.ย.",
+               "ก.ค.", "ส.ค.", "ก.ย.", "ต.ค.", "พ.ย.", "ธ.ค."]
+
+PHRASES = [
+    "รถไฟฟ้าสายสีม่วงมาช้ามากช่วงเช้า",
+    "ราคาค่าโดยสารแพงเกินไปสำหรับคนทำงาน",
+    "สถานีสะอาดและพนักงานบริการดี",
+    "ที่จอดรถไม่พอ ต้องมาแต่เช้า",
+    "แอปเติมเงินใช้งานยาก ล่มบ่อย",
+    "เชื่อมต่อสายอื่นสะดวกขึ้นเยอะ",
+    "แอร์ในขบวนเย็นสบาย",
+    "บันไดเลื่อนเสียหลายจุด ควรปรับปรุง",
+    "ชอบที่มีลิฟต์สำหรับผู้สูงอายุ",
+    "คนแน่นมากช่วงเย็น รอหลายขบวน",
+]
+
+def _comment_html(rng, idx):
+    sentences = " ".join(rng.choice(PHRASES) for _ in range(rng.randint(1, 4)))
+    return (
+        f'<div class="display-post-wrapper" id="comment-{idx}">'
+        f'<div class="display-post-story">\n  {sentences}\n  <br> ความเห็นที่ {idx}\n</div>'
+        '<div class="display-post-action">ถูกใจ 3</div></div>'
+    )
+
+def make_thread_html(n_replies, seed=0, title="รีวิวการเดินทางด้วยรถไฟฟ้า"):
+    """
+    Build a thread page with one opening post and n_replies replies.
+    """
+    rng = random.Random(seed)
+    parts = [
+        "<html><head><title>Pantip</title></head><body>",
+        f'<h2 class="display-post-title">{title} #{seed}</h2>',
+    ]
+    for idx in range(n_replies + 1):
+        parts.append(_comment_html(rng, idx))
+    parts.append("</body></html>")
+    return "\n".join(parts)
+
+def make_paged_thread_html(n_replies, page_size=100, seed=0, title="รีวิวการเดินทางด้วยรถไฟฟ้า"):
+    """
+    Snapshots of a long thread as "see more replies" is clicked: the first
+    shows the opening post and page_size replies, each click shows
+    page_size more, and every snapshot but the last has a see-more link.
+    """
+    rng = random.Random(seed)
+    head = [
+        "<html><head><title>Pantip</title></head><body>",
+        f'<h2 class="display-post-title">{title} #{seed}</h2>',
+    ]
+    comments = [_comment_html(rng, idx) for idx in range(n_replies + 1)]
+    snapshots = []
+    for shown in range(page_size + 1, n_replies + page_size + 1, page_size):
+        hidden = n_replies + 1 - shown
+        more = [f'<a class="reply see-more" href="#">ดูความเห็นเพิ่มเติม ({hidden})</a>'] if hidden > 0 else []
+        snapshots.append("\n".join(head + comments[:shown] + more + ["</body></html>"]))
+    return snapshots
+
+def make_search_html(n_results, seed=0, reply_counts=None):
+    """
+    Build a search results page with n_results threads, newest first.
+    reply_counts (one per thread) are shown next to each result when given.
+    """
+    rng = random.Random(seed)
+    parts = ["<html><body><ul>"]
+    for i in range(n_results):
+        day = 28 - (i % 28)
+        month = THAI_MONTHS[(11 - i // 28) % 12]
+        count = f'<span class="pt-li_stats-comment">{reply_counts[i]}</span>' if reply_counts else ""
+        parts.append(
+            '<li class="pt-list-item">'
+            f'<h2><a href="/topic/{43000000 + i}">กระทู้ทดสอบ {i} {rng.choice(PHRASES)}</a></h2>'
+            f'<span class="pt-sm-toggle-date-hide">{day} {month} 67</span>'
+            f"{count}</li>"
+        )
+    parts.append("</ul></body></html>")
+    return "\n".join(parts)
+
+def _read_recorded(name):
+    path = os.path.join(FIXTURE_DIR, name)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+    return None
+
+def load_search_page(n_results=30):
+    """
+    Return the recorded search page, or a generated one.
+    """
+    return _read_recorded("search.html") or make_search_html(n_results)
+
+def load_thread_pages():
+    """
+    Return {size_name: html} for small, medium and large threads.
+    """
+    pages = {}
+    for i, (name, n_replies) in enumerate(THREAD_SIZES.items()):
+        pages[name] = _read_recorded(f"thread_{name}.html") or make_thread_html(n_replies, seed=i)
+    return pages
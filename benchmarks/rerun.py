@@ -0,0 +1,91 @@
+"""
+Rerun-latency benchmark for the Streamlit pages.
+
+Usage (from the repository root):
+    python -m benchmarks.rerun --repeat 20
+    python -m benchmarks.rerun --threads 30 --json rerun_output.json
+
+Each page is loaded once with scraped threads, a summary and classification
+results already in the session (as after a real run), then rerun with no
+changes, which is what every widget interaction costs. Idle reruns should
+stay under the target (50 ms by default).
+"""
+import os
+import sys
+import json
+import random
+import argparse
+
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1 import app_test, local_script_runner
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+
+from pantip_listener.analysis import extract_all_comments_by_forum, SENTIMENTS
+from pantip_listener.scraping import parse_thread_page
+from pantip_listener.store import get_store
+from benchmarks.fakes import StubGenerativeModel
+from benchmarks.fixtures import make_thread_html
+from benchmarks.run import measure, print_report
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = {"MAIN": "MAIN.py", "DASHBOARD": os.path.join("pages", "DASHBOARD.py")}
+ASPECTS = ["ราคาค่าโดยสาร", "ความตรงต่อเวลา", "ความสะอาด", "การบริการ", "ไม่ถูกจัดประเภท"]
+
+# The server compiles each page once and reuses it; AppTest would recompile on every run
+_shared_script_cache = ScriptCache()
+app_test.ScriptCache = local_script_runner.ScriptCache = lambda: _shared_script_cache
+
+def seeded_session(n_threads, replies):
+    """
+    Session state as it looks after a search and a classification run.
+    """
+    forums = [parse_thread_page(make_thread_html(replies, seed=i)) for i in range(n_threads)]
+    rng = random.Random(0)
+    results = [
+        {"comment": comment, "aspect": rng.choice(ASPECTS), "sentiment": rng.choice(SENTIMENTS)}
+        for _, comments in extract_all_comments_by_forum(forums) for comment in comments
+    ]
+    store = get_store()
+    return {
+        "api_key": "bench-key",
+        "model_choice": "gemini-2.5-flash",
+        "all_forums_text_ref": store.put("bench", forums),
+        "comment_aspect_sentiment_ref": store.put("bench", results),
+        "llm_summary": StubGenerativeModel().generate_content("summary").text,
+    }, len(results)
+
+def run_rerun_benchmarks(repeat=20, n_threads=15, replies=90):
+    session, n_comments = seeded_session(n_threads, replies)
+    results = []
+    for name, path in PAGES.items():
+        app = AppTest.from_file(os.path.join(ROOT, path), default_timeout=60)
+        for key, value in session.items():
+            app.session_state[key] = value
+        results.append(measure(f"first_run[{name}]", app.run, 1, 1, trace_memory=False))
+        if app.exception:
+            raise RuntimeError(f"{path} failed: {app.exception[0].message}")
+        results.append(measure(f"idle_rerun[{name}]", app.run, 1, repeat, trace_memory=False))
+    return results, n_comments
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Streamlit rerun-latency benchmark")
+    parser.add_argument("--repeat", type=int, default=20, help="idle reruns per page")
+    parser.add_argument("--threads", type=int, default=15, help="threads in the seeded session")
+    parser.add_argument("--replies", type=int, default=90, help="replies per thread")
+    parser.add_argument("--target-ms", type=float, default=50.0, help="p50 budget for an idle rerun")
+    parser.add_argument("--json", dest="json_path", help="also write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results, n_comments = run_rerun_benchmarks(args.repeat, args.threads, args.replies)
+    print(f"session: {args.threads} threads, {n_comments} classified comments")
+    print_report(results)
+    slow = [r for r in results if r["stage"].startswith("idle_rerun") and r["p50_ms"] > args.target_ms]
+    for r in slow:
+        print(f"over target: {r['stage']} p50 {r['p50_ms']:.1f} ms > {args.target_ms:.0f} ms")
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 1 if slow else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
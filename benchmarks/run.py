@@ -0,0 +1,319 @@
+"""
+Offline benchmark for the scraping/parsing and LLM hot paths.
+
+Usage (from the repository root):
+    python -m benchmarks.run --repeat 5 --llm-latency 0.05
+    python -m benchmarks.run --llm-drop-rate 0.1
+    python -m benchmarks.run --json bench_output.json
+
+Each stage reports throughput, latency percentiles and peak traced memory.
+No network, Chrome or API key is needed.
+"""
+import argparse
+import json
+import time
+import tempfile
+import tracemalloc
+
+from pantip_listener import scraping
+from pantip_listener import scheduler as quota
+from pantip_listener.scraping import build_search_url, parse_search_results, parse_thread_page, scrape_thread
+from pantip_listener.analysis import (
+    build_summary_prompt, extract_aspects_from_summary, extract_all_comments_by_forum,
+    clean_aspect_names
+)
+from pantip_listener.aspects import discover_forum_aspects
+from pantip_listener.sampling import sample_forums
+from pantip_listener.scheduler import GeminiScheduler
+from pantip_listener.pipeline import summarize_incrementally, classify_forums, check_watch
+from pantip_listener.watchlist import Watchlist, KEYWORD
+from pantip_listener.jobs import Job
+from benchmarks.fixtures import (
+    load_search_page, load_thread_pages, make_search_html, make_thread_html, make_paged_thread_html,
+    THREAD_SIZES
+)
+from benchmarks.fakes import FakeDriver, StubGenerativeModel
+
+# -------------------- Measurement --------------------
+def percentile(values, pct):
+    """
+    Nearest-rank percentile of a list of numbers.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+def measure(name, fn, units, repeat, trace_memory=True):
+    """
+    Run fn() repeat times and collect timing and memory statistics.
+    units is the number of items one call processes (for throughput).
+    tracemalloc slows Python code down noticeably; pass trace_memory=False
+    when the latency itself is what is being checked.
+    """
+    latencies = []
+    if trace_memory:
+        tracemalloc.start()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    peak = 0
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    total = sum(latencies)
+    return {
+        "stage": name,
+        "runs": repeat,
+        "units": units,
+        "throughput": units * repeat / total if total else float("inf"),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "peak_kib": peak / 1024,
+    }
+
+def print_report(results):
+    header = f"{'stage':<28}{'units':>7}{'units/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'peak KiB':>11}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['stage']:<28}{r['units']:>7}{r['throughput']:>12.1f}{r['p50_ms']:>10.2f}"
+              f"{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}{r['peak_kib']:>11.1f}")
+        if "retries" in r:
+            print(f"{'':<28}retries: {r['retries']}, throttled: {r['throttled']} ({r['throttle_s']:.2f} s), "
+                  f"fallbacks: {r['fallbacks']}")
+        if "page_loads" in r:
+            print(f"{'':<28}page loads: {r['page_loads']}, comments classified: {r['classified']}")
+
+def expect(actual, expected, what):
+    """
+    Fail the benchmark run if a scenario's count is not what the code promises.
+    """
+    if actual != expected:
+        raise AssertionError(f"{what}: expected {expected}, got {actual}")
+
+# -------------------- Scenarios --------------------
+def check_resummarize_calls(n_threads=5):
+    """
+    Check the LLM calls of re-summarizing f, f, f[:3], f[:4], f: one direct call, nothing
+    for the same selection, then the per-thread partials and a merge, one new
+    partial and a merge, and nothing for a selection that was already merged.
+    """
+    forums = [parse_thread_page(make_thread_html(10, seed=100 + i)) for i in range(n_threads)]
+    model = StubGenerativeModel(model_name="stub-calls")
+    job = Job("benchmark")
+    steps = [(forums, 1), (forums, 0), (forums[:3], 3 + 1), (forums[:4], 1 + 1), (forums, 0)]
+    for i, (selection, calls) in enumerate(steps):
+        before = model.calls
+        summarize_incrementally(job, model, "stub-calls", selection)
+        expect(model.calls - before, calls, f"re-summarize step {i + 1} ({len(selection)} threads) LLM calls")
+    return model, forums
+
+def check_sample_sizes():
+    """
+    Check that sampling weighs threads by their full reply count, not by the
+    first page that was loaded: a 1,000-reply thread gets a larger share
+    than a 120-reply one, and the sample is reported against both totals.
+    """
+    forums = []
+    for n_replies in (1000, 120):
+        driver = FakeDriver({"https://pantip.com/topic/sized": make_paged_thread_html(n_replies)})
+        forums.append(scrape_thread(driver, "https://pantip.com/topic/sized", max_comments=40))
+    sampled, info = sample_forums(forums, 60)
+    kept = [len(comments) for _, comments in extract_all_comments_by_forum(sampled)]
+    expect((info["collected"], info["total"]), (200, 1120), "collected and total comments")
+    expect(kept, [43, 17], "comments kept per thread (sqrt of full size)")
+
+def run_scheduler_scenarios(window=0.5):
+    """
+    Quota scheduler against a local stub, with a one-minute window shortened
+    to window seconds: a 429 that is retried, a 2 requests/window budget
+    that makes calls wait, and gemini-2.5-pro over budget falling back to
+    gemini-2.5-flash. Each stage's retry, throttle and fallback counts are checked.
+    """
+    prompt = "สรุปความเห็นเกี่ยวกับรถไฟฟ้า"
+    scenarios = [
+        # (stage, model, calls, stub options, limits, allow_fallback, expected counts)
+        ("scheduler[429 retry]", "stub-429", 1, {"fail_first": 1}, {}, False,
+         {"requests": 1, "retries": 1, "fallbacks": 0}),
+        ("scheduler[2 rpm, 6 calls]", "stub-rpm", 6, {}, {"stub-rpm": (2, 100_000_000)}, False,
+         {"requests": 6, "retries": 0, "throttled": 2, "fallbacks": 0}),
+        ("scheduler[pro->flash]", "gemini-2.5-pro", 3, {},
+         {"gemini-2.5-pro": (1, 100_000_000), "gemini-2.5-flash": (100, 100_000_000)}, True,
+         {"requests": 3, "retries": 0, "throttled": 0, "fallbacks": 2}),
+    ]
+    results = []
+    default_window = quota.WINDOW_SECONDS
+    quota.WINDOW_SECONDS = window
+    try:
+        for stage, model_name, calls, options, limits, allow_fallback, expected in scenarios:
+            scheduler = GeminiScheduler(lambda api_key, name: StubGenerativeModel(model_name=name, **options),
+                                        limits=limits, backoff_base=0.01)
+            model = scheduler.model("bench-key", model_name, allow_fallback)
+            results.append(measure(stage, lambda: [model.generate_content(prompt) for _ in range(calls)],
+                                   calls, 1, trace_memory=False))
+            stats = scheduler.stats("bench-key")
+            for name, count in expected.items():
+                expect(stats[name], count, f"{stage} {name}")
+            results[-1].update({"retries": stats["retries"], "throttled": stats["throttled"],
+                                "throttle_s": stats["throttle_seconds"], "fallbacks": stats["fallbacks"]})
+    finally:
+        quota.WINDOW_SECONDS = default_window
+    return results
+
+# -------------------- Stages --------------------
+def run_benchmarks(repeat=5, llm_latency=0.0, llm_drop_rate=0.0, llm_fail_rate=0.1):
+    scraping.THREAD_DELAY = (0, 0)
+    scraping.CLICK_DELAY = 0
+    scraping.SETTLE_DELAY = 0
+    search_html = load_search_page()
+    thread_pages = load_thread_pages()
+    results = []
+
+    results.append(measure(
+        "parse_search", lambda: parse_search_results(search_html, 30), 30, repeat))
+
+    forums_text = {}
+    for size, html in thread_pages.items():
+        forums_text[size] = parse_thread_page(html)
+        n_posts = html.count('class="display-post-story"')
+        results.append(measure(
+            f"parse_thread[{size}]", lambda html=html: parse_thread_page(html), n_posts, repeat))
+
+    driver = FakeDriver({f"https://pantip.com/topic/{size}": html for size, html in thread_pages.items()})
+    urls = list(driver.pages)
+    results.append(measure(
+        "scrape_thread[all sizes]", lambda: [scrape_thread(driver, url) for url in urls], len(urls), repeat))
+
+    # A large thread behind "see more replies": full expansion vs stopping at max_comments
+    paged_url = "https://pantip.com/topic/paged"
+    paged = FakeDriver({paged_url: make_paged_thread_html(THREAD_SIZES["large"], page_size=100)})
+    results.append(measure(
+        "scrape_thread[see-more]", lambda: scrape_thread(paged, paged_url, see_more_rounds=10),
+        THREAD_SIZES["large"], repeat))
+    results.append(measure(
+        "scrape_thread[see-more,max150]",
+        lambda: scrape_thread(paged, paged_url, see_more_rounds=10, max_comments=150), 150, repeat))
+
+    corpus = list(forums_text.values())
+    n_comments = sum(len(c) for _, c in extract_all_comments_by_forum(corpus))
+    results.append(measure(
+        "extract_comments", lambda: extract_all_comments_by_forum(corpus), n_comments, repeat))
+
+    results.append(measure(
+        "sample_forums[budget 200]", lambda: sample_forums(corpus, 200), n_comments, repeat))
+    check_sample_sizes()
+
+    forums_comments = extract_all_comments_by_forum(corpus)
+    results.append(measure(
+        "discover_aspects[local]", lambda: discover_forum_aspects(forums_comments), n_comments, repeat))
+
+    model = StubGenerativeModel(latency=llm_latency, drop_rate=llm_drop_rate)
+    input_for_llm = "\n\n".join(corpus)
+    results.append(measure(
+        "summarize[stub]",
+        lambda: model.generate_content(build_summary_prompt(input_for_llm, True)),
+        1, repeat))
+
+    # Selection changes after the per-thread partials exist: only merge calls remain.
+    # The first re-summarize is a single call; the second builds the partials.
+    job = Job("benchmark")
+    subsets = [corpus[:i] + corpus[i + 1:] for i in range(len(corpus))]
+    summarize_incrementally(job, model, "stub", corpus)
+    summarize_incrementally(job, model, "stub", corpus)
+    toggles = iter(subsets * repeat)
+    results.append(measure(
+        "resummarize[toggle]",
+        lambda: summarize_incrementally(job, model, "stub", next(toggles)),
+        1, repeat))
+
+    # Asking again for a selection that was already summarized makes no call
+    counted, selection = check_resummarize_calls()
+    calls = counted.calls
+    results.append(measure(
+        "resummarize[same selection]",
+        lambda: summarize_incrementally(job, counted, "stub-calls", selection),
+        1, repeat))
+    expect(counted.calls - calls, 0, "LLM calls of repeated re-summarize")
+
+    # The classification job's loop, without its checkpoint so every run calls the model
+    aspects = clean_aspect_names(extract_aspects_from_summary(model.generate_content("summary").text))
+    results.append(measure(
+        "classify[stub]",
+        lambda: classify_forums(job, model, forums_comments, aspects),
+        n_comments, repeat))
+
+    # Same classification through the quota scheduler, against a stub that returns 429s
+    flaky = StubGenerativeModel(latency=llm_latency, drop_rate=llm_drop_rate, fail_rate=llm_fail_rate)
+    scheduler = GeminiScheduler(lambda api_key, model_name: flaky, backoff_base=0.01,
+                                limits={"stub": (10_000, 100_000_000)})
+    scheduled = scheduler.model("bench-key", "stub")
+    results.append(measure(
+        "classify[scheduler]",
+        lambda: classify_forums(job, scheduled, forums_comments, aspects),
+        n_comments, repeat))
+    stats = scheduler.stats("bench-key")
+    results[-1].update({"retries": stats["retries"], "throttled": stats["throttled"],
+                        "throttle_s": stats["throttle_seconds"], "fallbacks": stats["fallbacks"]})
+    results.extend(run_scheduler_scenarios())
+
+    results.extend(run_watch_benchmarks(model, aspects, repeat))
+    return results
+
+def run_watch_benchmarks(model, aspects, repeat, n_threads=300, n_changed=10):
+    """
+    Watchlist checks of one keyword with n_threads threads: a first full check,
+    idle checks where nothing changed, and a check after n_changed threads got replies.
+    """
+    replies = [5 + i % 20 for i in range(n_threads)]
+    search_url = build_search_url("รถไฟฟ้า", "")
+    urls = [f"https://pantip.com/topic/{43000000 + i}" for i in range(n_threads)]
+    pages = {url: make_thread_html(n, seed=i) for i, (url, n) in enumerate(zip(urls, replies))}
+    pages[search_url] = make_search_html(n_threads, reply_counts=replies)
+    driver = FakeDriver(pages)
+
+    watchlist = Watchlist(root=tempfile.mkdtemp(prefix="pantip-watch-"))
+    watch = watchlist.checkout(watchlist.add(KEYWORD, "รถไฟฟ้า", sort_option="", max_posts=n_threads,
+                                             aspects=aspects))
+    job = Job("benchmark")
+    results = []
+
+    def check(name, runs):
+        stats = {"watches": 0, "threads": 0, "fetched": 0, "new_comments": 0, "alerts": 0}
+        driver.requests = 0
+        result = measure(name, lambda: check_watch(job, watch, driver, model, stats), n_threads, runs)
+        result.update({"page_loads": driver.requests // runs, "classified": stats["new_comments"] // runs})
+        results.append(result)
+
+    check("watch_check[first]", 1)
+    check(f"watch_check[{n_threads} unchanged]", repeat)
+    for i in range(n_changed):
+        replies[i] += 3
+        pages[urls[i]] = make_thread_html(replies[i], seed=i)
+    pages[search_url] = make_search_html(n_threads, reply_counts=replies)
+    check(f"watch_check[{n_changed} changed]", 1)
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline Pantip Social Listener benchmarks")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per stage")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="stub LLM latency per call (seconds)")
+    parser.add_argument("--llm-drop-rate", type=float, default=0.0,
+                        help="fraction of stub classification records returned malformed")
+    parser.add_argument("--llm-fail-rate", type=float, default=0.1,
+                        help="fraction of stub calls answered with 429 in the scheduler stage")
+    parser.add_argument("--json", dest="json_path", help="also write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(repeat=args.repeat, llm_latency=args.llm_latency,
+                             llm_drop_rate=args.llm_drop_rate, llm_fail_rate=args.llm_fail_rate)
+    print_report(results)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
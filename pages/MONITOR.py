@@ -0,0 +1,222 @@
+from datetime import datetime
+
+import streamlit as st
+import pandas as pd
+
+from pantip_listener.scraping import SORT_OPTIONS, MAX_SEARCH_POSTS
+from pantip_listener.analysis import SENTIMENTS, UNCLASSIFIED_ASPECT
+from pantip_listener.monitor import get_monitor
+from pantip_listener.watchlist import (
+    KEYWORD, THREAD, DEFAULT_INTERVAL_MINUTES, get_watchlist, watch_sentiments, sentiment_shares
+)
+from pantip_listener.ui import STATUS_LABELS, job_table_sidebar, quota_sidebar
+
+# -------------------- Streamlit Page Config --------------------
+st.set_page_config(
+    page_title="Monitor",
+    page_icon="📡",
+    layout="centered",
+    initial_sidebar_state="expanded"
+)
+
+st.title("📡 ติดตามต่อเนื่อง (Monitor)")
+st.caption("ตรวจคีย์เวิร์ดและกระทู้ตามรอบเวลา ดึงเฉพาะกระทู้ที่มีการเปลี่ยนแปลง "
+           "และวิเคราะห์เฉพาะคอมเมนต์ใหม่ พร้อมแจ้งเตือนเมื่ออารมณ์เปลี่ยนไปมาก")
+
+watchlist = get_watchlist()
+monitor = get_monitor()
+
+def format_time(ts):
+    return datetime.fromtimestamp(ts).strftime("%d/%m/%Y %H:%M") if ts else "-"
+
+# -------------------- Sidebar: API Key & Model Selection --------------------
+st.sidebar.markdown("## 🔑 Configuration")
+api_key = st.sidebar.text_input(
+    "Google Gemini API Key",
+    value=st.session_state.get("api_key", ""),
+    type="password",
+    help="ใส่ Google Gemini API Key ของคุณ (ได้จาก https://makersuite.google.com/app/apikey)"
+)
+st.session_state["api_key"] = api_key
+if not api_key:
+    st.sidebar.warning("⚠️ กรุณาใส่ API Key ก่อนใช้งาน")
+
+st.sidebar.markdown("---")
+st.sidebar.markdown("## 🤖 เลือกโมเดล AI")
+model_options = [
+    "gemini-2.5-pro",
+    "gemini-2.5-flash",
+    "gemini-2.5-flash-lite-preview-06-17",
+    "gemini-2.0-flash",
+    "gemini-2.0-flash-lite"
+]
+model_choice = st.sidebar.selectbox(
+    "เลือกโมเดล Gemini",
+    options=model_options,
+    index=model_options.index(st.session_state.get("model_choice") or "gemini-2.5-flash"),
+    help="โมเดลที่ใช้วิเคราะห์คอมเมนต์ใหม่ระหว่างการติดตาม"
+)
+st.session_state["model_choice"] = model_choice
+
+job_table_sidebar()
+quota_sidebar(api_key, model_choice)
+
+# -------------------- Monitor Controls --------------------
+st.header("⚙️ การติดตาม")
+allow_fallback = st.toggle(
+    "💸 ใช้โมเดลที่ถูกกว่าเมื่อโควต้าของโมเดลที่เลือกเต็ม",
+    value=monitor.allow_fallback,
+    help="เมื่อเกินโควต้า requests/tokens ต่อนาที จะส่งคำขอวิเคราะห์ไปยังโมเดลที่ถูกกว่าแทนการรอ"
+)
+col_start, col_stop, col_now = st.columns(3)
+with col_start:
+    if st.button("▶️ เริ่มติดตาม", disabled=not api_key, use_container_width=True):
+        monitor.start(api_key, model_choice, allow_fallback)
+        st.rerun()
+with col_stop:
+    if st.button("⏹️ หยุดติดตาม", disabled=not monitor.running, use_container_width=True):
+        monitor.stop()
+        st.rerun()
+with col_now:
+    if st.button("🔄 ตรวจทั้งหมดตอนนี้", disabled=not api_key or not watchlist.list_watches(),
+                 use_container_width=True):
+        watch_ids = [w["id"] for w in watchlist.list_watches()]
+        if monitor.check(api_key, model_choice, watch_ids, allow_fallback) is None:
+            st.info("⏳ มีการตรวจที่กำลังทำงานอยู่ กรุณารอให้เสร็จก่อน")
+st.caption("🔒 API Key จะถูกเก็บไว้ในหน่วยความจำของเซิร์ฟเวอร์ระหว่างการติดตามเท่านั้น และจะถูกลบเมื่อหยุดติดตาม")
+
+@st.fragment(run_every=10)
+def monitor_status():
+    """
+    Monitor state, progress of the running check and the latest alerts.
+    """
+    if monitor.running:
+        st.success(f"🟢 กำลังติดตาม ตั้งแต่ {format_time(monitor.started_at)} (โมเดล: {monitor.model_choice})")
+    else:
+        st.info("⚪ ยังไม่ได้เริ่มติดตาม รายการจะถูกตรวจเมื่อกด 'เริ่มติดตาม' หรือ 'ตรวจทั้งหมดตอนนี้'")
+    job = monitor.last_job()
+    if job is not None and not job.finished:
+        st.progress(job.progress, text=f"{STATUS_LABELS[job.status]}: {job.message}")
+    elif job is not None and job.result:
+        stats = job.result
+        st.caption(f"ตรวจล่าสุด {format_time(job.finished_at)}: {stats['watches']} รายการ, "
+                   f"ดูแล้ว {stats['threads']} กระทู้, ดึงใหม่ {stats['fetched']} กระทู้, "
+                   f"วิเคราะห์คอมเมนต์ใหม่ {stats['new_comments']} คอมเมนต์")
+    elif job is not None and job.error:
+        st.error(f"❌ การตรวจล่าสุดล้มเหลว: {job.error}")
+
+    alerts = watchlist.alerts(limit=5)
+    if alerts:
+        st.markdown("#### 🚨 การเปลี่ยนแปลงของอารมณ์ล่าสุด")
+        for alert in alerts:
+            st.warning(
+                f"**{alert['target']}** ({format_time(alert['at'])}): สัดส่วน {alert['sentiment'].upper()} "
+                f"{alert['before']:.0%} → {alert['after']:.0%} ในคอมเมนต์ใหม่ {alert['comments']} คอมเมนต์"
+            )
+
+monitor_status()
+
+# -------------------- Add Watch --------------------
+st.markdown("---")
+st.header("➕ เพิ่มรายการติดตาม")
+with st.form("add_watch", clear_on_submit=True):
+    kind_labels = {KEYWORD: "🔍 คีย์เวิร์ด", THREAD: "🔗 ลิงก์กระทู้"}
+    kind = st.radio("ประเภท", list(kind_labels), format_func=kind_labels.get, horizontal=True)
+    target = st.text_input("คีย์เวิร์ด หรือ ลิงก์กระทู้ (https://pantip.com/topic/...)")
+    col_sort, col_posts, col_interval = st.columns(3)
+    with col_sort:
+        sort_option = st.selectbox("เรียงผลการค้นหา", SORT_OPTIONS, index=1)
+    with col_posts:
+        max_posts = st.number_input("จำนวนกระทู้ต่อคีย์เวิร์ด", min_value=1, max_value=MAX_SEARCH_POSTS, value=20)
+    with col_interval:
+        interval = st.number_input("ตรวจทุก (นาที)", min_value=5, max_value=24 * 60,
+                                   value=DEFAULT_INTERVAL_MINUTES, step=5)
+    aspects_text = st.text_input(
+        "Aspect (คั่นด้วยจุลภาค, เว้นว่างเพื่อค้นหาจากคอมเมนต์ชุดแรก)",
+        help="Aspect จะถูกกำหนดตายตัวหลังการตรวจครั้งแรก เพื่อให้เปรียบเทียบผลข้ามรอบได้"
+    )
+    if st.form_submit_button("➕ เพิ่ม"):
+        target = target.strip()
+        if not target:
+            st.error("❌ กรุณาใส่คีย์เวิร์ดหรือลิงก์กระทู้")
+        elif kind == THREAD and not target.startswith("https://pantip.com/topic/"):
+            st.error("❌ ลิงก์กระทู้ต้องขึ้นต้นด้วย https://pantip.com/topic/")
+        else:
+            aspects = [a.strip() for a in aspects_text.split(",") if a.strip()]
+            watchlist.add(kind, target, sort_option=sort_option, max_posts=max_posts,
+                          interval_minutes=interval, aspects=aspects + [UNCLASSIFIED_ASPECT] if aspects else None)
+            st.success(f"✅ เพิ่ม '{target}' แล้ว จะถูกตรวจในรอบถัดไป")
+
+# -------------------- Watchlist --------------------
+st.markdown("---")
+st.header("📋 รายการติดตาม")
+watches = watchlist.list_watches()
+if not watches:
+    st.info("ยังไม่มีรายการติดตาม")
+    st.stop()
+
+rows = []
+for watch in watches:
+    counts = watch_sentiments(watch)
+    shares = sentiment_shares(counts)
+    rows.append({
+        "รายการ": watch["target"],
+        "ประเภท": kind_labels[watch["kind"]],
+        "กระทู้": len(watch["threads"]),
+        "คอมเมนต์": sum(counts.values()),
+        **{s.upper(): f"{shares[s]:.0%}" for s in SENTIMENTS},
+        "ตรวจล่าสุด": format_time(watch["last_checked"]),
+        "ตรวจครั้งถัดไป": format_time(watch["next_due"]),
+        "ข้อผิดพลาด": watch["last_error"] or "",
+    })
+st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+
+@st.fragment
+def watch_detail():
+    """
+    Trend, aspects, latest comments and threads of one watch.
+    """
+    watch_id = st.selectbox(
+        "เลือกรายการเพื่อดูรายละเอียด",
+        [w["id"] for w in watches],
+        format_func=lambda watch_id: watchlist.get(watch_id)["target"] if watchlist.get(watch_id) else watch_id
+    )
+    watch = watchlist.get(watch_id)
+    if watch is None:
+        return
+
+    if watch["history"]:
+        st.markdown("#### 📈 สัดส่วน Sentiment ของคอมเมนต์ใหม่ในแต่ละรอบ")
+        trend = pd.DataFrame(
+            [sentiment_shares(point["new"]) for point in watch["history"]],
+            index=[datetime.fromtimestamp(point["at"]) for point in watch["history"]],
+        )
+        st.line_chart(trend, color=["#21ba45", "#767676", "#db2828"])
+    else:
+        st.info("ยังไม่มีคอมเมนต์ที่วิเคราะห์แล้วสำหรับรายการนี้")
+
+    if watch["counts"]:
+        st.markdown("#### 🧩 Sentiment ตาม Aspect")
+        st.dataframe(
+            pd.DataFrame([{"Aspect": aspect, **counts} for aspect, counts in watch["counts"].items()]),
+            use_container_width=True, hide_index=True
+        )
+    if watch["recent"]:
+        with st.expander(f"💬 คอมเมนต์ใหม่ล่าสุด ({len(watch['recent'])})", expanded=False):
+            st.dataframe(pd.DataFrame(watch["recent"]), use_container_width=True, hide_index=True)
+    if watch["threads"]:
+        with st.expander(f"🧵 กระทู้ที่ติดตาม ({len(watch['threads'])})", expanded=False):
+            threads = sorted(watch["threads"].items(), key=lambda item: -item[1]["last_changed"])
+            st.dataframe(pd.DataFrame([{
+                "กระทู้": state["title"],
+                "ลิงก์": url,
+                "คอมเมนต์ที่เห็น": state["comments_seen"],
+                **{s.upper(): state["counts"][s] for s in SENTIMENTS},
+                "เปลี่ยนแปลงล่าสุด": format_time(state["last_changed"]),
+            } for url, state in threads]), use_container_width=True, hide_index=True)
+
+    if st.button("🗑️ ลบรายการนี้", key=f"remove_{watch_id}"):
+        watchlist.remove(watch_id)
+        st.rerun()
+
+watch_detail()
@@ -0,0 +1,3 @@
+"""
+Scraping and analysis helpers shared by the Streamlit pages.
+"""
@@ -0,0 +1,224 @@
+import re
+import json
+
+# -------------------- Summary Prompt --------------------
+def build_summary_prompt(input_text, sentiment_toggle=True, aspect_hint=None):
+    """
+    Build the aspect-based summary prompt for the given forum texts.
+    aspect_hint lists candidate aspects found locally in the comments.
+    """
+    prompt_parts = [
+        "You are a LLM-powered social-listening application, tasked to summarize Pantip posts and comments into aspects in THAI LANGUAGE.",
+        "Here are the texts you need to summarize:",
+        input_text,
+        "Summarize the information into each aspect in this format:",
+        "**สรุปโดยย่อ**: {summary}",
+        "**{aspect1}**: {aspect1_summary}",
+        "**{aspect2}**: {aspect2_summary}",
+        "and so on...",
+        "Aspect is not the same as thread, it is what have been discussed.",
+        "You must response in the format above.",
+        "You must response in THAI LANGUAGE only.",
+        "Every paragraph MUST have a new line between them"
+    ]
+    if aspect_hint:
+        prompt_parts.insert(-3, "Topics that were found in the comments (key terms and number of comments), "
+                                "use them as a guide for choosing aspects:\n" + aspect_hint)
+    if sentiment_toggle:
+        prompt_parts.insert(-2, "For each aspect, add a new line below the summary in this format:\n**อารมณ์ (Sentiment)**: <label> (positive😄, neutral😐, or negative😡)")
+    return "\n".join(prompt_parts)
+
+def build_merge_prompt(partial_summaries, sentiment_toggle=True, aspect_hint=None):
+    """
+    Build the prompt that merges per-thread summaries into one summary
+    in the same format as build_summary_prompt.
+    """
+    sections = [f"--- Thread {i} ---\n{text}" for i, text in enumerate(partial_summaries, start=1)]
+    prompt_parts = [
+        "You are a LLM-powered social-listening application. Below are aspect-based summaries of individual Pantip threads, written in THAI LANGUAGE.",
+        "Here are the summaries you need to merge:",
+        "\n\n".join(sections),
+        "Merge them into one summary of all threads together, combining aspects that mean the same thing, in this format:",
+        "**สรุปโดยย่อ**: {summary}",
+        "**{aspect1}**: {aspect1_summary}",
+        "**{aspect2}**: {aspect2_summary}",
+        "and so on...",
+        "Aspect is not the same as thread, it is what have been discussed.",
+        "You must response in the format above.",
+        "You must response in THAI LANGUAGE only.",
+        "Every paragraph MUST have a new line between them"
+    ]
+    if aspect_hint:
+        prompt_parts.insert(-3, "Topics that were found in the comments (key terms and number of comments), "
+                                "use them as a guide for choosing aspects:\n" + aspect_hint)
+    if sentiment_toggle:
+        prompt_parts.insert(-2, "For each aspect, add a new line below the summary in this format:\n**อารมณ์ (Sentiment)**: <label> (positive😄, neutral😐, or negative😡)\n"
+                                "Weigh each thread's sentiment by how much it discusses the aspect.")
+    return "\n".join(prompt_parts)
+
+def forum_title(forum_text):
+    """
+    Return the thread title from a forum text block.
+    """
+    lines = forum_text.split('\n')
+    title = lines[0] if lines else ""
+    if title.startswith("หัวข้อ : "):
+        title = title.replace("หัวข้อ : ", "", 1)
+    return title
+
+# -------------------- Aspect Extraction --------------------
+def extract_aspects_from_summary(summary_text):
+    """
+    Extract aspect names from the AI summary.
+    Ignores unwanted aspects like 'Sentiment' and 'N/A'.
+    """
+    aspect_pattern = re.compile(r"\*\*(.+?)\*\*:")
+    aspects = []
+    for line in summary_text.splitlines():
+        match = aspect_pattern.match(line)
+        if match and "สรุปโดยย่อ" not in match.group(1):
+            aspects.append(match.group(1).strip())
+    aspects = [a for a in aspects if a not in ["อารมณ์ (Sentiment)", "Sentiment", "N/A"]]
+    return aspects
+
+def extract_all_comments_by_forum(forums_text):
+    """
+    Extracts all comments from each forum thread.
+    Returns a list of (forum_title, comments_list).
+    """
+    forums_comments = []
+    for forum_text in forums_text:
+        lines = forum_text.split('\n')
+        title = forum_title(forum_text)
+        comments = [line.split(":", 1)[-1].strip() for line in lines if line.startswith("คอมเมนต์ที่")]
+        forums_comments.append((title, comments))
+    return forums_comments
+
+def clean_aspect_names(aspects):
+    """
+    Cleans aspect names to keep only the Thai part before any parenthesis.
+    Removes English-only aspects and duplicates.
+    """
+    cleaned = []
+    for a in aspects:
+        th = re.sub(r"\s*\(.*?\)", "", a).strip()
+        if re.search(r"[\u0E00-\u0E7F]", th) and th not in ["", "N/A"]:
+            cleaned.append(th)
+    # Remove duplicates while preserving order
+    seen = set()
+    result = []
+    for x in cleaned:
+        if x not in seen:
+            seen.add(x)
+            result.append(x)
+    # Add "ไม่ถูกจัดประเภท" if not already present
+    if "ไม่ถูกจัดประเภท" not in result:
+        result.append("ไม่ถูกจัดประเภท")
+    return result
+
+# -------------------- Comment Classification --------------------
+SENTIMENTS = ["positive", "neutral", "negative"]
+UNCLASSIFIED_ASPECT = "ไม่ถูกจัดประเภท"
+
+def classification_schema(aspects):
+    """
+    Response schema for one classification call: a list of
+    {index, aspect, sentiment} records, with aspect and sentiment as enums.
+    """
+    return {
+        "type": "ARRAY",
+        "items": {
+            "type": "OBJECT",
+            "properties": {
+                "index": {"type": "INTEGER"},
+                "aspect": {"type": "STRING", "enum": list(aspects)},
+                "sentiment": {"type": "STRING", "enum": SENTIMENTS},
+            },
+            "required": ["index", "aspect", "sentiment"],
+        },
+    }
+
+def build_classification_prompt(title, numbered_comments, aspects):
+    """
+    Build the prompt for classifying (index, comment) pairs of one thread.
+    """
+    prompt = (
+        f"หัวข้อกระทู้: {title}\n"
+        "คุณคือ AI วิเคราะห์ความคิดเห็นใน Pantip\n"
+        "สำหรับแต่ละคอมเมนต์ด้านล่าง ให้ระบุ Aspect (เลือกจาก: " +
+        ", ".join(aspects) +
+        ") ที่เกี่ยวข้องมากที่สุด และระบุอารมณ์ (Sentiment) จาก 3 ตัวเลือกนี้เท่านั้นว่าเป็น positive, neutral, หรือ negative\n"
+        "ตอบกลับเป็น JSON list เท่านั้น หนึ่งรายการต่อหนึ่งคอมเมนต์ โดยใช้หมายเลขคอมเมนต์เป็น index ห้ามอธิบายเพิ่ม เช่น:\n"
+        '[{"index": 1, "aspect": "...", "sentiment": "..."}]\n\n'
+        "Comments:\n"
+    )
+    lines = [f"{i}. {comment}" for i, comment in numbered_comments]
+    return prompt + "\n".join(lines) + "\n"
+
+def iter_json_objects(text):
+    """
+    Yield every JSON object that can be decoded from text, skipping over
+    malformed or truncated ones instead of failing the whole response.
+    """
+    decoder = json.JSONDecoder()
+    pos = text.find("{")
+    while pos != -1:
+        try:
+            obj, end = decoder.raw_decode(text, pos)
+        except ValueError:
+            pos = text.find("{", pos + 1)
+            continue
+        if isinstance(obj, dict):
+            yield obj
+        pos = text.find("{", end)
+
+def parse_classification_records(text, pending, aspects):
+    """
+    Parse a classification response into {index: (aspect, sentiment)},
+    keeping only valid records for indices still pending.
+    """
+    parsed = {}
+    for obj in iter_json_objects(text):
+        try:
+            index = int(obj.get("index"))
+        except (TypeError, ValueError):
+            continue
+        sentiment = str(obj.get("sentiment", "")).strip().lower()
+        if index not in pending or index in parsed or sentiment not in SENTIMENTS:
+            continue
+        aspect = str(obj.get("aspect", "")).strip()
+        if aspect not in aspects:
+            if UNCLASSIFIED_ASPECT not in aspects:
+                continue
+            aspect = UNCLASSIFIED_ASPECT
+        parsed[index] = (aspect, sentiment)
+    return parsed
+
+def classify_forum_comments(title, comments, aspects, model, max_retries=2):
+    """
+    Classify one thread's comments. Valid records are kept as they arrive and
+    only missing or invalid comment indices are re-requested.
+    Returns {index: (aspect, sentiment)} with 1-based indices. API errors
+    (invalid key, permissions, quota) propagate; only a response without
+    text, e.g. one that was blocked, is retried like a malformed one.
+    """
+    generation_config = {
+        "response_mime_type": "application/json",
+        "response_schema": classification_schema(aspects),
+    }
+    pending = set(range(1, len(comments) + 1))
+    labels = {}
+    for _ in range(max_retries + 1):
+        if not pending:
+            break
+        numbered = [(i, comments[i - 1]) for i in sorted(pending)]
+        prompt = build_classification_prompt(title, numbered, aspects)
+        response = model.generate_content(prompt, generation_config=generation_config)
+        try:
+            text = response.text
+        except ValueError:
+            continue
+        parsed = parse_classification_records(text, pending, aspects)
+        labels.update(parsed)
+        pending -= parsed.keys()
+    return labels
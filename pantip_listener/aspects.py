@@ -0,0 +1,255 @@
+"""
+Local, CPU-only aspect discovery from scraped comments.
+
+Comments are tokenized (PyThaiNLP words; Thai character n-grams grown to
+whole words if it is not installed), weighted with TF-IDF and grouped with spherical k-means
+in NumPy. Each cluster is labelled with its top terms, so the aspects can be
+used for classification or as a hint for the summary prompt without first
+asking the LLM for a summary.
+"""
+import re
+import math
+from collections import Counter
+
+import numpy as np
+
+from pantip_listener.analysis import UNCLASSIFIED_ASPECT
+
+try:
+    from pythainlp.tokenize import word_tokenize
+    from pythainlp.corpus import thai_stopwords
+except ImportError:
+    word_tokenize = None
+    thai_stopwords = None
+
+# Particles and function words that never make a useful aspect label
+STOPWORDS = {
+    "ครับ", "ค่ะ", "คะ", "นะ", "นะคะ", "นะครับ", "จ้า", "จ้ะ", "ค่า", "คับ", "ฮะ", "อะ", "เลย", "ด้วย",
+    "ที่", "และ", "ก็", "ไม่", "ได้", "มี", "เป็น", "ว่า", "จะ", "ให้", "ของ", "ใน", "แต่", "กับ", "มา",
+    "ไป", "แล้ว", "อยู่", "คือ", "เรา", "ผม", "ฉัน", "เขา", "คุณ", "นี้", "นั้น", "อะไร", "ยัง", "หรือ",
+    "ความเห็นที่", "คอมเมนต์", "the", "and", "is", "to", "of",
+}
+# Stopwords for PyThaiNLP words, combined once rather than for every comment
+WORD_STOPWORDS = STOPWORDS | set(thai_stopwords()) if thai_stopwords is not None else STOPWORDS
+
+NGRAM_SIZES = (3, 4, 5)
+MAX_FEATURES = 3000
+MIN_DF = 2
+MAX_DF_RATIO = 0.5
+LABEL_SAMPLE = 200
+
+_TOKEN_RUNS = re.compile(r"[\u0E00-\u0E7F]+|[A-Za-z0-9]+")
+# Thai characters that cannot start a word (following vowels, tone marks) or end one (leading vowels)
+_NO_START = set("ะาำัิีึืุู่้๊๋์็ๆฯ")
+_NO_END = set("เแโใไ")
+
+# -------------------- Tokenization --------------------
+def _thai_ngrams(run):
+    grams = []
+    for n in NGRAM_SIZES:
+        for i in range(len(run) - n + 1):
+            gram = run[i:i + n]
+            if gram[0] not in _NO_START and gram[-1] not in _NO_END:
+                grams.append(gram)
+    return grams
+
+def tokenize(text):
+    """
+    Terms of one comment: PyThaiNLP words if available, otherwise Thai
+    character n-grams plus lower-cased Latin words.
+    """
+    if word_tokenize is not None:
+        words = word_tokenize(text, engine="newmm", keep_whitespace=False)
+        return [w.lower() for w in words
+                if len(w) > 1 and _TOKEN_RUNS.fullmatch(w) and w.lower() not in WORD_STOPWORDS]
+    terms = []
+    for run in _TOKEN_RUNS.findall(text):
+        if run[0].isascii():
+            if len(run) > 1 and not run.isdigit():
+                terms.append(run.lower())
+        else:
+            terms.extend(_thai_ngrams(run))
+    return [t for t in terms if t not in STOPWORDS]
+
+# -------------------- Vectors --------------------
+def tfidf_matrix(docs_terms, max_features=MAX_FEATURES, min_df=MIN_DF, max_df_ratio=MAX_DF_RATIO):
+    """
+    L2-normalized sublinear TF-IDF matrix (docs x terms, float32) and its vocabulary.
+    Terms in fewer than min_df or more than max_df_ratio of the documents are dropped.
+    """
+    counts = [Counter(terms) for terms in docs_terms]
+    df = Counter()
+    for c in counts:
+        df.update(c.keys())
+    max_df = max(min_df, int(max_df_ratio * len(counts)))
+    kept = [t for t, n in df.items() if min_df <= n <= max_df]
+    kept.sort(key=lambda t: (-df[t], t))
+    vocab = kept[:max_features]
+    index = {t: i for i, t in enumerate(vocab)}
+
+    matrix = np.zeros((len(counts), len(vocab)), dtype=np.float32)
+    for row, c in enumerate(counts):
+        for term, n in c.items():
+            col = index.get(term)
+            if col is not None:
+                matrix[row, col] = 1.0 + math.log(n)
+    if vocab:
+        idf = np.array([math.log((1 + len(counts)) / (1 + df[t])) + 1.0 for t in vocab], dtype=np.float32)
+        matrix *= idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix, vocab
+
+# -------------------- Clustering --------------------
+def spherical_kmeans(matrix, k, max_iter=30, seed=0):
+    """
+    k-means on unit vectors with cosine similarity and k-means++ seeding.
+    Returns (labels, centroids).
+    """
+    rng = np.random.default_rng(seed)
+    n = matrix.shape[0]
+    centroids = [matrix[rng.integers(n)]]
+    for _ in range(1, k):
+        distance = 1.0 - np.max(matrix @ np.array(centroids).T, axis=1)
+        distance = np.clip(distance, 0.0, None)
+        total = distance.sum()
+        pick = rng.choice(n, p=distance / total) if total > 0 else rng.integers(n)
+        centroids.append(matrix[pick])
+    centroids = np.array(centroids)
+
+    labels = None
+    for _ in range(max_iter):
+        similarity = matrix @ centroids.T
+        new_labels = similarity.argmax(axis=1)
+        if labels is not None and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        for c in range(k):
+            members = matrix[labels == c]
+            if len(members):
+                center = members.sum(axis=0)
+            else:
+                # Re-seed an empty cluster with the worst-fitting comment
+                center = matrix[similarity.max(axis=1).argmin()]
+            norm = np.linalg.norm(center)
+            centroids[c] = center / norm if norm > 0 else center
+    return labels, centroids
+
+def extend_term(term, texts, min_support=0.6, max_len=40):
+    """
+    Grow a Thai n-gram one character at a time while most of the texts that
+    contain it agree on the next character, so labels become whole words.
+    Growth stops where the texts diverge, which is a word boundary; max_len
+    only guards against comments pasted many times, since stopping at a
+    fixed length would cut a word.
+    """
+    if word_tokenize is not None or term.isascii():
+        return term
+    texts = [t for t in texts if term in t]
+    base = len(texts)
+    if not base:
+        return term
+    while len(term) < max_len:
+        neighbours = Counter()
+        for text in texts:
+            seen = set()
+            start = text.find(term)
+            while start != -1:
+                if start > 0:
+                    seen.add(text[start - 1] + term)
+                end = start + len(term)
+                if end < len(text):
+                    seen.add(term + text[end])
+                start = text.find(term, start + 1)
+            neighbours.update(seen)
+        candidates = [(n, t) for t, n in neighbours.items() if _TOKEN_RUNS.fullmatch(t) and not t.isascii()]
+        if not candidates:
+            break
+        count, best = max(candidates)
+        if count < min_support * base:
+            break
+        term = best
+    # Trim so the label does not start or end in the middle of a syllable
+    while len(term) > 2 and (term[0] in _NO_START or term[-1] in _NO_END):
+        term = term[1:] if term[0] in _NO_START else term[:-1]
+    return term
+
+def _overlaps(a, b, n=4):
+    if a in b or b in a:
+        return True
+    return any(a[i:i + n] in b for i in range(len(a) - n + 1))
+
+def _label_terms(centroid, vocab, texts, top_terms):
+    """
+    Highest-weighted terms of a centroid, extended to whole words and
+    skipping ones that overlap a term already picked.
+    """
+    picked = []
+    for col in np.argsort(-centroid)[:top_terms * 10]:
+        if centroid[col] <= 0 or len(picked) >= top_terms:
+            break
+        term = extend_term(vocab[col], texts)
+        if any(_overlaps(term, p) for p in picked):
+            continue
+        picked.append(term)
+    return picked
+
+def default_aspect_count(n_docs):
+    return int(min(8, max(2, round(math.sqrt(n_docs / 4)))))
+
+def discover_aspects(comments, n_aspects=None, top_terms=3, examples=3, seed=0):
+    """
+    Group comments into candidate aspects.
+    Returns a list of {name, terms, size, examples}, largest first.
+    """
+    docs_terms = [tokenize(c) for c in comments]
+    matrix, vocab = tfidf_matrix(docs_terms)
+    has_terms = np.flatnonzero(matrix.any(axis=1)) if vocab else np.array([], dtype=int)
+    if len(has_terms) < 4:
+        return []
+    matrix = matrix[has_terms]
+    k = min(n_aspects or default_aspect_count(len(has_terms)), len(has_terms))
+    labels, centroids = spherical_kmeans(matrix, k, seed=seed)
+
+    min_size = max(2, int(0.02 * len(has_terms)))
+    aspects = []
+    seen = set()
+    for c in range(k):
+        members = np.flatnonzero(labels == c)
+        if len(members) < min_size:
+            continue
+        # Label from the comments nearest the centroid; that is enough to grow words
+        ranked = members[np.argsort(-(matrix[members] @ centroids[c]))]
+        texts = [comments[has_terms[i]] for i in ranked[:LABEL_SAMPLE]]
+        terms = _label_terms(centroids[c], vocab, texts, top_terms)
+        name = " / ".join(terms[:2])
+        if not terms or name in seen:
+            continue
+        seen.add(name)
+        aspects.append({
+            "name": name,
+            "terms": terms,
+            "size": int(len(members)),
+            "examples": texts[:examples],
+        })
+    aspects.sort(key=lambda a: -a["size"])
+    return aspects
+
+def discover_forum_aspects(forums_comments, **kwargs):
+    """
+    discover_aspects over the comments of (title, comments) pairs.
+    """
+    return discover_aspects([c for _, comments in forums_comments for c in comments], **kwargs)
+
+# -------------------- Using Discovered Aspects --------------------
+def aspect_names(discovered):
+    """
+    Aspect list for classification: discovered names plus the unclassified bucket.
+    """
+    return [a["name"] for a in discovered] + [UNCLASSIFIED_ASPECT]
+
+def aspect_hint(discovered):
+    """
+    One line per discovered aspect with its key terms, for the summary prompt.
+    """
+    return "\n".join(f"- {', '.join(a['terms'])} ({a['size']} comments)" for a in discovered)
@@ -0,0 +1,127 @@
+"""
+Server-wide cache of search results shared across sessions.
+
+Scraped threads are cached by normalized search parameters and summaries by
+(search, model, sentiment option), each for a freshness window, so analysts
+running the same search reuse one scrape and one Gemini call.
+"""
+import os
+import re
+import json
+import hashlib
+import time
+import zlib
+import threading
+from collections import OrderedDict
+
+CACHE_TTL_SECONDS = int(float(os.environ.get("PANTIP_CACHE_TTL_MINUTES", "30")) * 60)
+CACHE_MAX_ENTRIES = int(os.environ.get("PANTIP_CACHE_MAX_ENTRIES", "64"))
+# Per-thread partial summaries are small and reused for as long as a session lives
+PARTIAL_TTL_SECONDS = int(float(os.environ.get("PANTIP_PARTIAL_TTL_HOURS", "6")) * 60 * 60)
+PARTIAL_MAX_ENTRIES = int(os.environ.get("PANTIP_PARTIAL_MAX_ENTRIES", "2048"))
+
+def normalize_keyword(keyword):
+    """
+    Case- and whitespace-insensitive form of a search keyword.
+    """
+    return re.sub(r"\s+", " ", keyword or "").strip().casefold()
+
+def search_key(keyword, sort_option, max_posts, date_filter, comment_budget=None):
+    """
+    Cache key for the threads scraped by one search.
+    """
+    date_part = date_filter.isoformat() if date_filter else None
+    return json.dumps(["search", normalize_keyword(keyword), sort_option, int(max_posts), date_part,
+                       comment_budget or None], ensure_ascii=False)
+
+def summary_key(search_cache_key, model_choice, sentiment_toggle, use_aspect_hint=False):
+    """
+    Cache key for the summary of a search's threads.
+    """
+    return json.dumps(["summary", search_cache_key, model_choice, bool(sentiment_toggle), bool(use_aspect_hint)],
+                      ensure_ascii=False)
+
+def text_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+def partial_key(model_choice, sentiment_toggle, forum_text):
+    """
+    Cache key for the summary of a single thread.
+    """
+    return json.dumps(["partial", model_choice, bool(sentiment_toggle), text_hash(forum_text)])
+
+def resummarized_key(partial_key):
+    """
+    Cache key marking a thread that was re-summarized once without a per-thread summary.
+    """
+    return json.dumps(["resummarized", partial_key])
+
+def merge_key(model_choice, sentiment_toggle, partial_keys, hint=None):
+    """
+    Cache key for the merged summary of a set of threads (order does not matter).
+    """
+    return json.dumps(["merge", model_choice, bool(sentiment_toggle), sorted(partial_keys), text_hash(hint or "")])
+
+class ResultCache:
+    """
+    LRU of compressed JSON values with a freshness window.
+    """
+
+    def __init__(self, ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        (value, age_seconds) if a fresh entry exists, else None.
+        """
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None or time.time() - item[0] > self.ttl:
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            created, blob = item
+        return json.loads(zlib.decompress(blob).decode("utf-8")), time.time() - created
+
+    def put(self, key, value):
+        blob = zlib.compress(json.dumps(value, ensure_ascii=False).encode("utf-8"), 6)
+        with self._lock:
+            self._entries[key] = (time.time(), blob)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+_cache = None
+_partial_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    """
+    Process-wide ResultCache shared by every session.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache()
+        return _cache
+
+def get_partial_cache():
+    """
+    Process-wide cache of per-thread and merged summaries.
+    """
+    global _partial_cache
+    with _cache_lock:
+        if _partial_cache is None:
+            _partial_cache = ResultCache(ttl=PARTIAL_TTL_SECONDS, max_entries=PARTIAL_MAX_ENTRIES)
+        return _partial_cache
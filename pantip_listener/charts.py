@@ -0,0 +1,236 @@
+"""
+Tables and Plotly figures for the Dashboard, cached across reruns.
+
+Builders are keyed by the session store ref of their data (the data itself
+is passed with a leading underscore so Streamlit does not hash it), so an
+idle rerun reuses the built figures. Plotly is only imported the first time
+a chart is needed.
+"""
+import math
+
+import pandas as pd
+import streamlit as st
+
+from pantip_listener.analysis import forum_title, UNCLASSIFIED_ASPECT
+
+SENTIMENT_COLOR_MAP = {"positive": "green", "negative": "red", "neutral": "gray"}
+SENTIMENT_THAI = {"positive": "POSITIVE", "negative": "NEGATIVE", "neutral": "NEUTRAL"}
+SENTIMENT_COLOR_HTML = {"positive": "#21ba45", "negative": "#db2828", "neutral": "#767676"}
+SENTIMENT_ORDER = ["positive", "negative", "neutral"]
+
+# Streamlit's chart theme restyles the figures anyway; the default Plotly
+# template is several KB of layout that would be validated and serialized
+# again for every chart on every rerun
+CHART_TEMPLATE = "none"
+
+# Per-aspect pie grid: columns, height of a row and room for a two-line title
+PIE_COLUMNS = 3
+PIE_ROW_PX = 260
+PIE_TITLE_PX = 50
+PIE_TITLE_CHARS = 24
+
+def plain_figure(fig):
+    """
+    Copy of a figure with its NumPy arrays turned into lists. Streamlit
+    serializes every chart again on each rerun, and base64-encoding the
+    arrays is most of that cost.
+    """
+    import plotly.graph_objects as go
+
+    def plain(value):
+        if hasattr(value, "tolist"):
+            return value.tolist()
+        if isinstance(value, dict):
+            return {k: plain(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [plain(v) for v in value]
+        return value
+
+    return go.Figure(plain(fig.to_plotly_json()))
+
+@st.cache_resource(max_entries=8, ttl=3600, show_spinner=False)
+def thread_overview(ref, _forums):
+    """
+    Table of threads with their comment counts and its bar chart.
+    """
+    import plotly.express as px
+
+    data = []
+    for i, forum_text in enumerate(_forums):
+        lines = forum_text.split('\n')
+        title = forum_title(forum_text)
+        num_comments = sum(1 for line in lines if line.startswith("คอมเมนต์ที่"))
+        data.append({
+            "Thread": f"{i+1}. {title[:40]}{'...' if len(title) > 40 else ''}",
+            "Comments": num_comments
+        })
+    df = pd.DataFrame(data)
+    fig = px.bar(df, x="Thread", y="Comments", labels={"Thread": "กระทู้", "Comments": "จำนวนคอมเมนต์"},
+                 template=CHART_TEMPLATE)
+    return df, plain_figure(fig)
+
+def dominant_sentiment_of(sentiment_counts):
+    """
+    NEGATIVE wins ties, but if positive==negative the aspect is neutral.
+    """
+    if sentiment_counts.empty:
+        return None
+    max_count = sentiment_counts["count"].max()
+    dominant_sentiments = sentiment_counts[sentiment_counts["count"] == max_count]["sentiment"].tolist()
+    if "positive" in dominant_sentiments and "negative" in dominant_sentiments and len(dominant_sentiments) == 2:
+        return "neutral"
+    if "negative" in dominant_sentiments:
+        return "negative"
+    if "positive" in dominant_sentiments:
+        return "positive"
+    return dominant_sentiments[0]
+
+@st.cache_resource(max_entries=8, ttl=3600, show_spinner=False)
+def aspect_charts(ref, _comment_aspect_sentiment):
+    """
+    DataFrame, aspect order, figures and CSV export of one classification result.
+    """
+    import plotly.express as px
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    df_aspect = pd.DataFrame(_comment_aspect_sentiment)
+
+    # Sort aspects so "ไม่ถูกจัดประเภท" is always last
+    aspects_order = [a for a in df_aspect["aspect"].unique() if a != UNCLASSIFIED_ASPECT]
+    if UNCLASSIFIED_ASPECT in df_aspect["aspect"].unique():
+        aspects_order.append(UNCLASSIFIED_ASPECT)
+
+    # All pies go in one figure: one chart to serialize per rerun instead of one per aspect
+    n_rows = math.ceil(len(aspects_order) / PIE_COLUMNS)
+    titles = []
+    pies = []
+    for aspect in aspects_order:
+        df_aspect_sub = df_aspect[df_aspect["aspect"] == aspect]
+        sentiment_counts = df_aspect_sub["sentiment"].value_counts().reset_index()
+        sentiment_counts.columns = ["sentiment", "count"]
+        dominant_sentiment = dominant_sentiment_of(sentiment_counts)
+        name = aspect if len(aspect) <= PIE_TITLE_CHARS else aspect[:PIE_TITLE_CHARS] + "…"
+        if dominant_sentiment:
+            color = SENTIMENT_COLOR_HTML.get(dominant_sentiment, "#767676")
+            name += f"<br><span style='color:{color}'>{SENTIMENT_THAI[dominant_sentiment]}</span>"
+        titles.append(f"<b>{name}</b>")
+        pies.append(go.Pie(
+            labels=sentiment_counts["sentiment"],
+            values=sentiment_counts["count"],
+            marker=dict(colors=[SENTIMENT_COLOR_MAP.get(s, "gray") for s in sentiment_counts["sentiment"]], line=dict(width=0)),
+            textinfo="percent+label",
+            textposition="inside",
+        ))
+    fig_pies = make_subplots(
+        rows=n_rows,
+        cols=PIE_COLUMNS,
+        specs=[[{"type": "domain"}] * PIE_COLUMNS for _ in range(n_rows)],
+        subplot_titles=titles,
+        vertical_spacing=PIE_TITLE_PX / (PIE_ROW_PX * n_rows),
+    )
+    for i, pie in enumerate(pies):
+        fig_pies.add_trace(pie, row=i // PIE_COLUMNS + 1, col=i % PIE_COLUMNS + 1)
+    fig_pies.update_layout(
+        template=CHART_TEMPLATE,
+        showlegend=False,
+        margin=dict(l=0, r=0, t=PIE_TITLE_PX, b=0),
+        height=PIE_ROW_PX * n_rows,
+    )
+
+    # --- Stacked Bar Chart: Sentiment counts per aspect ---
+    bar_df = df_aspect.groupby(["aspect", "sentiment"]).size().reset_index(name="count")
+    bar_df["aspect"] = pd.Categorical(bar_df["aspect"], categories=aspects_order, ordered=True)
+    bar_df["sentiment"] = pd.Categorical(bar_df["sentiment"], categories=SENTIMENT_ORDER, ordered=True)
+
+    fig_vbar = px.bar(
+        bar_df,
+        x="aspect",
+        y="count",
+        color="sentiment",
+        color_discrete_map=SENTIMENT_COLOR_MAP,
+        labels={"aspect": "Aspect", "count": "จำนวนคอมเมนต์", "sentiment": "Sentiment"},
+        title="จำนวนคอมเมนต์แต่ละ Sentiment ในแต่ละ Aspect (Vertical Stacked Bar)",
+        template=CHART_TEMPLATE
+    )
+    fig_vbar.update_layout(
+        barmode="stack",
+        xaxis_title="Aspect",
+        yaxis_title="จำนวนคอมเมนต์",
+        showlegend=True,
+        height=350
+    )
+    fig_vbar.update_traces(texttemplate=None, textposition=None)
+
+    # Add only one sum number on top of each bar
+    total_counts = df_aspect.groupby("aspect")["comment"].count().reindex(aspects_order, fill_value=0)
+    for aspect in aspects_order:
+        fig_vbar.add_annotation(
+            x=aspect,
+            y=total_counts[aspect],
+            text=str(total_counts[aspect]),
+            showarrow=False,
+            font=dict(size=14, color="black"),
+            yshift=2,
+            yanchor="bottom"
+        )
+
+    # --- Overall Sentiment Horizontal Bar ---
+    overall_counts = df_aspect["sentiment"].value_counts().reindex(SENTIMENT_ORDER, fill_value=0)
+    overall_df = pd.DataFrame({
+        "Sentiment": SENTIMENT_ORDER,
+        "Count": [overall_counts[s] for s in SENTIMENT_ORDER]
+    })
+
+    fig_overall = px.bar(
+        overall_df,
+        x="Count",
+        y="Sentiment",
+        orientation="h",
+        color="Sentiment",
+        color_discrete_map=SENTIMENT_COLOR_MAP,
+        title="อารมณ์โดยรวมของ Keyword (ตามจำนวนคอมเมนต์)",
+        labels={"Count": "จำนวนคอมเมนต์", "Sentiment": "Sentiment"},
+        template=CHART_TEMPLATE
+    )
+    fig_overall.update_layout(showlegend=False, xaxis_title="จำนวนคอมเมนต์", yaxis_title="Sentiment")
+
+    # --- Single Horizontal Stacked Bar: Overall Sentiment Distribution ---
+    total_comments = overall_counts.sum()
+    bar_data = pd.DataFrame({
+        "Sentiment": SENTIMENT_ORDER,
+        "Count": [overall_counts[s] for s in SENTIMENT_ORDER],
+        "Percent": [f"{(overall_counts[s]/total_comments*100):.1f}%" if total_comments > 0 else "0.0%" for s in SENTIMENT_ORDER]
+    })
+
+    fig_single_bar = px.bar(
+        bar_data,
+        x="Count",
+        y=["รวมทุก Aspect"] * len(bar_data),
+        color="Sentiment",
+        color_discrete_map=SENTIMENT_COLOR_MAP,
+        orientation="h",
+        text="Percent",
+        labels={"Count": "จำนวนคอมเมนต์", "Sentiment": "Sentiment"},
+        title="อารมณ์โดยรวมของ Keyword (ตามสัดส่วน)",
+        template=CHART_TEMPLATE
+    )
+    fig_single_bar.update_layout(
+        barmode="stack",
+        showlegend=False,
+        xaxis_title="จำนวนคอมเมนต์",
+        yaxis_title="",
+        yaxis=dict(showticklabels=False),
+        height=300
+    )
+    fig_single_bar.update_traces(textposition="auto")
+
+    return {
+        "df": df_aspect,
+        "aspects_order": aspects_order,
+        "pies": plain_figure(fig_pies),
+        "vbar": plain_figure(fig_vbar),
+        "overall": plain_figure(fig_overall),
+        "single_bar": plain_figure(fig_single_bar),
+        "csv": df_aspect.to_csv(index=False, encoding="utf-8-sig"),
+    }
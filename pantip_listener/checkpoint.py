@@ -0,0 +1,124 @@
+"""
+On-disk checkpoints so an interrupted run resumes from its last completed unit.
+
+A run is identified by a hash of its parameters, so submitting the same
+search again picks up the saved thread texts and LLM outputs instead of
+starting over. Completed runs delete their checkpoint.
+"""
+import os
+import json
+import time
+import shutil
+import hashlib
+
+from pantip_listener.config import DATA_DIR
+
+CHECKPOINT_DIR = os.path.join(DATA_DIR, "checkpoints")
+
+# Abandoned checkpoints older than this are removed
+CHECKPOINT_TTL_SECONDS = 24 * 60 * 60
+# Pages look checkpoints up on every rerun, so the directory is scanned at most this often
+PRUNE_INTERVAL_SECONDS = 10 * 60
+
+_last_prune = 0.0
+
+def params_hash(*parts):
+    """
+    Stable short hash of JSON-serializable parameters.
+    """
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+def write_json(path, value):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(value, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+def read_json(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+class RunCheckpoint:
+    """
+    Saved progress of one run: its thread URLs, per-thread scraped text
+    and named LLM outputs. Every write is atomic.
+    """
+
+    def __init__(self, kind, run_id, root=CHECKPOINT_DIR):
+        self.kind = kind
+        self.run_id = run_id
+        self.path = os.path.join(root, f"{kind}-{run_id}")
+
+    def _file(self, *parts):
+        return os.path.join(self.path, *parts)
+
+    def exists(self):
+        return os.path.isdir(self.path)
+
+    def touch(self):
+        write_json(self._file("meta.json"), {"kind": self.kind, "updated_at": time.time()})
+
+    # --- Search results ---
+    def thread_urls(self):
+        return read_json(self._file("urls.json"))
+
+    def save_thread_urls(self, urls):
+        write_json(self._file("urls.json"), urls)
+        self.touch()
+
+    # --- Scraped threads ---
+    def thread_text(self, url):
+        value = read_json(self._file("threads", f"{params_hash(url)}.json"))
+        return value["text"] if value else None
+
+    def save_thread_text(self, url, text):
+        write_json(self._file("threads", f"{params_hash(url)}.json"), {"url": url, "text": text})
+        self.touch()
+
+    def saved_thread_count(self):
+        try:
+            return len(os.listdir(self._file("threads")))
+        except OSError:
+            return 0
+
+    # --- LLM outputs ---
+    def llm_output(self, key):
+        return read_json(self._file("llm", f"{params_hash(key)}.json"))
+
+    def save_llm_output(self, key, value):
+        write_json(self._file("llm", f"{params_hash(key)}.json"), value)
+        self.touch()
+
+    def clear(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+def checkpoint_for(kind, *params):
+    """
+    Checkpoint for a run of the given kind and parameters.
+    """
+    global _last_prune
+    now = time.time()
+    if now - _last_prune >= PRUNE_INTERVAL_SECONDS:
+        _last_prune = now
+        prune_checkpoints()
+    return RunCheckpoint(kind, params_hash(*params))
+
+def prune_checkpoints(ttl=CHECKPOINT_TTL_SECONDS, root=CHECKPOINT_DIR):
+    """
+    Delete checkpoints that have not been updated for ttl seconds.
+    """
+    if not os.path.isdir(root):
+        return
+    cutoff = time.time() - ttl
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        try:
+            if os.path.getmtime(os.path.join(path, "meta.json")) < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError:
+            continue
@@ -0,0 +1,7 @@
+"""
+Server-wide settings read from the environment.
+"""
+import os
+
+# Root for checkpoints, spilled session data and other local state
+DATA_DIR = os.environ.get("PANTIP_DATA_DIR", os.path.join(os.getcwd(), ".pantip_data"))
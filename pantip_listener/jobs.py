@@ -0,0 +1,184 @@
+"""
+Background job runner so scrapes and LLM calls survive Streamlit reruns.
+
+Jobs run on a process-wide thread pool; pages keep only the job id in
+session state and poll the job table for status, progress and results.
+"""
+import os
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+# Concurrent jobs per server and how long finished jobs stay in the table
+MAX_WORKERS = int(os.environ.get("PANTIP_MAX_JOBS", "4"))
+JOB_TTL_SECONDS = 60 * 60
+
+class JobCancelled(Exception):
+    """Raised inside a job function when the user cancelled the job."""
+
+class Job:
+    """
+    One submitted unit of work and its observable state.
+    """
+
+    def __init__(self, kind, label="", dedupe_key=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.label = label
+        self.dedupe_key = dedupe_key
+        # Sessions waiting on this job; identical requests attach instead of starting another
+        self.watchers = 1
+        self.status = PENDING
+        self.progress = 0.0
+        self.message = "รอคิว..."
+        self.warnings = []
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATES
+
+    def update(self, progress=None, message=None):
+        """
+        Report progress (0..1) and/or a status message from the job function.
+        Raises JobCancelled if the job was cancelled, so long loops stop promptly.
+        """
+        if progress is not None:
+            self.progress = max(0.0, min(1.0, progress))
+        if message is not None:
+            self.message = message
+        if self.cancelled:
+            raise JobCancelled()
+
+    def warn(self, message):
+        self.warnings.append(message)
+
+class JobRunner:
+    """
+    Thread pool plus a job table keyed by job id.
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pantip-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind, fn, *args, label="", dedupe_key=None, **kwargs):
+        """
+        Schedule fn(job, *args, **kwargs) and return the job id.
+        The function's return value becomes job.result. If an unfinished job
+        with the same dedupe_key exists, the caller is attached to it instead.
+        """
+        self.prune()
+        with self._lock:
+            if dedupe_key is not None:
+                for existing in self._jobs.values():
+                    if existing.dedupe_key == dedupe_key and not existing.finished and not existing.cancelled:
+                        existing.watchers += 1
+                        return existing.id
+            job = Job(kind, label, dedupe_key)
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job.id
+
+    def _run(self, job, fn, args, kwargs):
+        if job.cancelled:
+            job.status = CANCELLED
+            job.finished_at = time.time()
+            return
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            job.result = fn(job, *args, **kwargs)
+            job.progress = 1.0
+            job.status = DONE
+        except JobCancelled:
+            job.status = CANCELLED
+        except Exception as e:
+            job.error = e
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self, job_ids=None):
+        """
+        Jobs newest first, optionally restricted to the given ids.
+        """
+        with self._lock:
+            jobs = list(self._jobs.values())
+        if job_ids is not None:
+            wanted = set(job_ids)
+            jobs = [j for j in jobs if j.id in wanted]
+        return sorted(jobs, key=lambda j: j.created_at, reverse=True)
+
+    def cancel(self, job_id):
+        """
+        Stop watching a job; it is only cancelled when nobody else is waiting on it.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return
+            job.watchers -= 1
+            if job.watchers <= 0:
+                job._cancel.set()
+
+    def release(self, job_id):
+        """
+        Called when a watcher has taken the result; the last one frees it.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.watchers -= 1
+            if job.watchers <= 0:
+                job.result = None
+
+    def active_count(self):
+        with self._lock:
+            return sum(1 for j in self._jobs.values() if not j.finished)
+
+    def prune(self, ttl=JOB_TTL_SECONDS):
+        """
+        Drop finished jobs older than ttl seconds.
+        """
+        cutoff = time.time() - ttl
+        with self._lock:
+            for job_id in [j.id for j in self._jobs.values() if j.finished and j.finished_at < cutoff]:
+                del self._jobs[job_id]
+
+_runner = None
+_runner_lock = threading.Lock()
+
+def get_runner():
+    """
+    Process-wide JobRunner shared by every session and page.
+    """
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner()
+        return _runner
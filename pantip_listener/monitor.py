@@ -0,0 +1,108 @@
+"""
+Background monitor that checks due watchlist entries on a schedule.
+
+One daemon thread per server wakes up every tick and, when watches are due
+and no check is still running, submits a single check job for all of them
+to the shared job runner. The API key is only held in memory while
+monitoring is on; it is never written to disk.
+"""
+import os
+import time
+import threading
+
+from pantip_listener.jobs import get_runner
+from pantip_listener.pipeline import run_watch_job
+from pantip_listener.watchlist import get_watchlist
+
+TICK_SECONDS = int(os.environ.get("PANTIP_WATCH_TICK_SECONDS", "30"))
+
+class Monitor:
+    """
+    Scheduler thread for the watchlist plus the last check job it started.
+    """
+
+    def __init__(self, watchlist, tick_seconds=TICK_SECONDS):
+        self.watchlist = watchlist
+        self.tick_seconds = tick_seconds
+        self.api_key = None
+        self.model_choice = None
+        self.allow_fallback = False
+        self.started_at = None
+        self.job_id = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+
+    def start(self, api_key, model_choice, allow_fallback=False):
+        """
+        Start polling with this key and model; a running monitor just switches to them.
+        """
+        with self._lock:
+            self.api_key = api_key
+            self.model_choice = model_choice
+            self.allow_fallback = allow_fallback
+            if self.running:
+                return
+            self._stop = threading.Event()
+            self.started_at = time.time()
+            self._thread = threading.Thread(target=self._loop, args=(self._stop,), name="pantip-monitor",
+                                            daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """
+        Stop polling and forget the API key; a check already running finishes.
+        """
+        with self._lock:
+            self._stop.set()
+            self.api_key = None
+            self.started_at = None
+
+    def _loop(self, stop):
+        while not stop.is_set():
+            self.tick()
+            stop.wait(self.tick_seconds)
+
+    def check(self, api_key, model_choice, watch_ids, allow_fallback=False):
+        """
+        Submit a check of watch_ids unless a check is still running.
+        Returns the job id, or None if nothing was submitted.
+        """
+        with self._lock:
+            runner = get_runner()
+            job = runner.get(self.job_id) if self.job_id else None
+            if (job is not None and not job.finished) or not watch_ids or not api_key:
+                return None
+            if job is not None:
+                runner.release(self.job_id)
+            self.job_id = runner.submit(
+                "watch", run_watch_job, api_key, model_choice, list(watch_ids), allow_fallback,
+                label=f"ตรวจรายการติดตาม {len(watch_ids)} รายการ"
+            )
+            return self.job_id
+
+    def tick(self):
+        """
+        Check every due watch with the monitor's key and model.
+        """
+        return self.check(self.api_key, self.model_choice, self.watchlist.due(), self.allow_fallback)
+
+    def last_job(self):
+        return get_runner().get(self.job_id) if self.job_id else None
+
+_monitor = None
+_monitor_lock = threading.Lock()
+
+def get_monitor():
+    """
+    Process-wide Monitor over the shared watchlist.
+    """
+    global _monitor
+    with _monitor_lock:
+        if _monitor is None:
+            _monitor = Monitor(get_watchlist())
+        return _monitor
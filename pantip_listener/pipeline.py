@@ -0,0 +1,492 @@
+"""
+Job functions for the background runner: scrape, summarize, classify.
+
+Each takes the Job as its first argument to report progress, and returns
+a plain dict that the page copies into session state when the job is done.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from pantip_listener.scraping import (
+    build_search_url, create_driver, driver_alive, quit_driver, load_search_results, parse_search_results,
+    parse_search_listing, scrape_thread, probe_thread, polite_pause
+)
+from pantip_listener.analysis import (
+    build_summary_prompt, build_merge_prompt, classify_forum_comments, extract_all_comments_by_forum,
+    UNCLASSIFIED_ASPECT
+)
+from pantip_listener.checkpoint import checkpoint_for, params_hash
+from pantip_listener.cache import (
+    get_cache, get_partial_cache, summary_key, partial_key, resummarized_key, merge_key, text_hash
+)
+from pantip_listener.sampling import expansion_limit, sample_forums, sample_positions
+from pantip_listener.watchlist import (
+    KEYWORD, MAX_NEW_COMMENTS, WATCH_SEE_MORE_ROUNDS, get_watchlist, thread_changed, unseen_comments,
+    record_thread, finish_check, watch_sentiments, empty_counts, add_counts
+)
+from pantip_listener.jobs import JobCancelled
+from pantip_listener.scheduler import GeminiScheduler
+
+# genai.configure is process-global, so configuring and building a model is serialized
+_configure_lock = threading.Lock()
+
+def gemini_model(api_key, model_choice):
+    """
+    Build a GenerativeModel bound to api_key. The scheduler calls this once
+    per (api_key, model) and reuses the model, so genai is only imported and
+    configured when a key is first used.
+    """
+    import google.generativeai as genai
+    from google.generativeai import client as genai_client
+
+    with _configure_lock:
+        genai.configure(api_key=api_key)
+        model = genai.GenerativeModel(model_choice)
+        # Pin the client created for this key so later configure() calls for other keys don't affect it
+        model._client = genai_client.get_default_generative_client()
+        return model
+
+scheduler = GeminiScheduler(gemini_model)
+
+def make_model(api_key, model_choice, allow_fallback=False):
+    """
+    Model whose calls go through the shared quota-aware scheduler.
+    """
+    return scheduler.model(api_key, model_choice, allow_fallback)
+
+def usage_of(response):
+    """
+    Token usage of a Gemini response as a dict, or None.
+    """
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return None
+    return {
+        "total": usage.total_token_count,
+        "input": usage.prompt_token_count,
+        "output": usage.candidates_token_count,
+    }
+
+def add_usage(total, usage):
+    if usage is None:
+        return total
+    if total is None:
+        return dict(usage)
+    return {k: total[k] + usage[k] for k in ("total", "input", "output")}
+
+# -------------------- Scraping --------------------
+def search_checkpoint(search_url, max_posts, date_filter, comment_budget=None):
+    """
+    Checkpoint shared by every run of the same search.
+    """
+    if comment_budget:
+        return checkpoint_for("search", search_url, max_posts, date_filter, comment_budget)
+    return checkpoint_for("search", search_url, max_posts, date_filter)
+
+def scrape_forums(job, search_url, max_posts, date_filter=None, progress_span=(0.0, 1.0), checkpoint=None,
+                  comment_budget=None):
+    """
+    Scrape the search results and every matching thread.
+    Returns (forums_text, failed_urls). Threads already saved in the
+    checkpoint are not fetched again.
+    With a comment_budget, threads stop expanding once they show enough
+    replies to fill their share of it.
+    If Chrome crashes, a fresh driver retries the thread once; a second crash
+    fails the job, leaving the threads scraped so far in the checkpoint.
+    The Chrome driver is always closed, even if the job fails or is cancelled.
+    """
+    start, end = progress_span
+    driver = None
+    try:
+        thread_urls = checkpoint.thread_urls() if checkpoint else None
+        if thread_urls is None:
+            job.update(start, "🔍 กำลังเปิดเบราว์เซอร์และค้นหา...")
+            driver = create_driver()
+            page_source = load_search_results(driver, search_url, max_posts)
+            job.update(start, "🔗 กำลังประมวลผลลิงก์กระทู้...")
+            thread_urls = parse_search_results(page_source, max_posts, date_filter)
+            if checkpoint:
+                checkpoint.save_thread_urls(thread_urls)
+        max_comments = expansion_limit(comment_budget, len(thread_urls))
+        forums_text = []
+        failed = []
+        for i, url in enumerate(thread_urls):
+            saved = checkpoint.thread_text(url) if checkpoint else None
+            if saved is not None:
+                job.update(start + (end - start) * i / len(thread_urls),
+                           f"♻️ ใช้ข้อมูลที่บันทึกไว้ของกระทู้ที่ {i+1}/{len(thread_urls)}")
+                forums_text.append(saved)
+                continue
+            job.update(start + (end - start) * i / len(thread_urls),
+                       f"📝 กำลังดึงข้อมูลกระทู้ที่ {i+1}/{len(thread_urls)}")
+            text = None
+            for attempt in range(2):
+                if driver is None:
+                    driver = create_driver()
+                try:
+                    text = scrape_thread(driver, url, max_comments=max_comments)
+                    break
+                except Exception as e:
+                    if driver_alive(driver):
+                        job.warn(f"Error scraping {url}: {e}")
+                        break
+                    quit_driver(driver)
+                    driver = None
+                    if attempt:
+                        raise RuntimeError(f"Chrome crashed twice while scraping {url}: {e}") from e
+            if text is None:
+                failed.append(url)
+                continue
+            forums_text.append(text)
+            if checkpoint:
+                checkpoint.save_thread_text(url, text)
+            polite_pause()
+        return forums_text, failed
+    finally:
+        if driver is not None:
+            quit_driver(driver)
+
+# -------------------- LLM Steps --------------------
+def thread_aspect_hint(job, forums_text):
+    """
+    Summary prompt hint from aspects discovered locally in the threads' comments (no LLM call).
+    """
+    # NumPy is only needed when the hint is requested
+    from pantip_listener.aspects import discover_forum_aspects, aspect_hint
+
+    job.update(message="🧭 กำลังค้นหา Aspect จากคอมเมนต์...")
+    return aspect_hint(discover_forum_aspects(extract_all_comments_by_forum(forums_text)))
+
+def summarize_forums(job, model, forums_text, sentiment_toggle=True, checkpoint=None, hint=None):
+    """
+    Summarize forum texts into aspects. Returns (summary_text, usage).
+    A summary saved in the checkpoint for the same model and input is reused.
+    """
+    input_for_llm = "\n\n".join(forums_text)
+    key = ("summary", model.model_name, sentiment_toggle, params_hash(input_for_llm, hint))
+    saved = checkpoint.llm_output(key) if checkpoint else None
+    if saved:
+        return saved["text"], saved["usage"]
+    job.update(message="🤖 กำลังสรุปผลด้วย Gemini AI...")
+    response = model.generate_content(build_summary_prompt(input_for_llm, sentiment_toggle, hint))
+    text, usage = response.text, usage_of(response)
+    if checkpoint:
+        checkpoint.save_llm_output(key, {"text": text, "usage": usage})
+    return text, usage
+
+def classify_forums(job, model, forums_comments, aspects, checkpoint=None):
+    """
+    Classify the comments of every thread. Returns (results, unlabelled)
+    where results are {comment, aspect, sentiment} dicts and unlabelled
+    counts comments the model never returned a valid label for.
+    Threads saved in the checkpoint are reused, and threads whose comments
+    were all labelled are saved to it.
+    """
+    total = len(forums_comments)
+    results = []
+    unlabelled = 0
+    for idx, (title, comments) in enumerate(forums_comments):
+        job.update(idx / total, f"🤖 วิเคราะห์แล้ว {idx}/{total} กระทู้")
+        if not comments:
+            continue
+        saved = checkpoint.llm_output(("classify", idx)) if checkpoint else None
+        if saved is not None:
+            labels = {int(i): tuple(v) for i, v in saved.items()}
+        else:
+            labels = classify_forum_comments(title, comments, aspects, model)
+            if len(labels) != len(comments):
+                unlabelled += len(comments) - len(labels)
+            elif checkpoint:
+                checkpoint.save_llm_output(("classify", idx), labels)
+        for index in sorted(labels):
+            aspect, sentiment = labels[index]
+            results.append({"comment": comments[index - 1], "aspect": aspect, "sentiment": sentiment})
+    return results, unlabelled
+
+# Parallel per-thread summary calls; the scheduler still enforces the key's quota
+PARTIAL_WORKERS = 4
+
+def summarize_incrementally(job, model, model_choice, forums_text, sentiment_toggle=True, hint=None):
+    """
+    Summarize each thread once (partials are cached server-wide), then merge
+    the selected partials. Returns (summary_text, usage, stats) where stats
+    counts reused and newly computed partials.
+    A selection summarized before is returned without any call. Partials
+    cost one call per thread before the first merge, so the first
+    re-summarize of threads without any is a single call over the selection;
+    partials are only built once a different selection of those threads is
+    re-summarized, when further changes are likely and each then costs one
+    small merge.
+    """
+    cache = get_partial_cache()
+    keys = [partial_key(model_choice, sentiment_toggle, text) for text in forums_text]
+    stats = {"reused": 0, "new": 0, "merge_cached": False, "direct": False}
+    usage = None
+
+    mkey = merge_key(model_choice, sentiment_toggle, keys, hint)
+    # The same selection summarized before (directly or merged) needs no call at all
+    cached = cache.get(mkey)
+    if cached:
+        stats["merge_cached"] = True
+        return cached[0], usage, stats
+
+    partials = {}
+    missing = []
+    for key, text in zip(keys, forums_text):
+        cached = cache.get(key)
+        if cached:
+            partials[key] = cached[0]
+            stats["reused"] += 1
+        elif key not in partials:
+            partials[key] = None
+            missing.append((key, text))
+
+    # Nothing to reuse and not re-summarized before: one call over the selection
+    if not stats["reused"] and not any(cache.get(resummarized_key(key)) for key in keys):
+        job.update(0.5, "🤖 กำลังสรุปผลด้วย Gemini AI...")
+        response = model.generate_content(build_summary_prompt("\n\n".join(forums_text), sentiment_toggle, hint))
+        cache.put(mkey, response.text)
+        for key in keys:
+            cache.put(resummarized_key(key), True)
+        stats["direct"] = True
+        return response.text, usage_of(response), stats
+
+    def summarize_one(text):
+        response = model.generate_content(build_summary_prompt(text, sentiment_toggle))
+        return response.text, usage_of(response)
+
+    if missing:
+        pool = ThreadPoolExecutor(max_workers=PARTIAL_WORKERS, thread_name_prefix="pantip-partial")
+        try:
+            futures = [(key, pool.submit(summarize_one, text)) for key, text in missing]
+            for done, (key, future) in enumerate(futures, start=1):
+                text, part_usage = future.result()
+                cache.put(key, text)
+                partials[key] = text
+                usage = add_usage(usage, part_usage)
+                stats["new"] += 1
+                job.update(0.8 * done / len(missing), f"🤖 สรุปรายกระทู้ {done}/{len(missing)}")
+        finally:
+            # Don't start the remaining calls if the job failed or was cancelled
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    ordered = [partials[key] for key in dict.fromkeys(keys)]
+    if len(ordered) == 1:
+        return ordered[0], usage, stats
+    job.update(0.85, f"🧩 กำลังรวมสรุปจาก {len(ordered)} กระทู้...")
+    response = model.generate_content(build_merge_prompt(ordered, sentiment_toggle, hint))
+    cache.put(mkey, response.text)
+    return response.text, add_usage(usage, usage_of(response)), stats
+
+# -------------------- Job Entry Points --------------------
+def run_search_job(job, api_key, model_choice, search_url, max_posts, date_filter, sentiment_toggle,
+                   cache_key=None, use_aspect_hint=False, comment_budget=None):
+    """
+    Scrape threads for a search and summarize them, resuming from any
+    checkpoint left by an earlier failed or cancelled run. With a cache_key,
+    fresh results of an identical search from any session are reused; runs
+    that missed threads are not cached.
+    With use_aspect_hint, locally discovered aspects guide the summary.
+    With a comment_budget, only a stratified sample of the comments is kept.
+    """
+    cache = get_cache()
+    result = {"all_forums_text": [], "llm_summary": None, "usage": None, "summary_error": None,
+              "cache_age": None, "summary_cached": False, "sample_info": None}
+    checkpoint = None
+    failed = []
+    cached = cache.get(cache_key) if cache_key else None
+    if cached:
+        (forums_text, result["sample_info"]), result["cache_age"] = cached
+        job.update(0.8, "♻️ ใช้ผลการค้นหาจากแคช")
+    else:
+        checkpoint = search_checkpoint(search_url, max_posts, date_filter, comment_budget)
+        forums_text, failed = scrape_forums(job, search_url, max_posts, date_filter, progress_span=(0.0, 0.8),
+                                            checkpoint=checkpoint, comment_budget=comment_budget)
+        if failed:
+            # Keep the checkpoint so running the search again only retries these threads
+            job.warn(f"{len(failed)} threads could not be scraped; run the search again to retry them")
+        if comment_budget and forums_text:
+            forums_text, result["sample_info"] = sample_forums(forums_text, comment_budget)
+        # Partial results stay out of the server-wide cache, so other sessions scrape the missing threads
+        if cache_key and forums_text and not failed and not job.warnings:
+            cache.put(cache_key, [forums_text, result["sample_info"]])
+    result["all_forums_text"] = forums_text
+    if not forums_text:
+        if checkpoint and not failed:
+            checkpoint.clear()
+        return result
+
+    job.update(0.85)
+    key = summary_key(cache_key, model_choice, sentiment_toggle, use_aspect_hint) if cache_key else None
+    cached = cache.get(key) if key else None
+    if cached:
+        result["llm_summary"] = cached[0][0]
+        result["summary_cached"] = True
+    else:
+        # Keep the scraped threads even if summarization fails
+        try:
+            hint = thread_aspect_hint(job, forums_text) if use_aspect_hint else None
+            model = make_model(api_key, model_choice)
+            result["llm_summary"], result["usage"] = summarize_forums(
+                job, model, forums_text, sentiment_toggle, checkpoint=checkpoint, hint=hint)
+        except JobCancelled:
+            raise
+        except Exception as e:
+            result["summary_error"] = str(e)
+            return result
+        if key and not failed and not job.warnings:
+            cache.put(key, [result["llm_summary"], result["usage"]])
+    if checkpoint and not failed:
+        checkpoint.clear()
+    return result
+
+def run_summary_job(job, api_key, model_choice, forums_text, sentiment_toggle, use_aspect_hint=False):
+    """
+    Re-summarize an already scraped selection of threads from cached
+    per-thread summaries, so changing the selection only costs a merge call.
+    """
+    hint = thread_aspect_hint(job, forums_text) if use_aspect_hint else None
+    model = make_model(api_key, model_choice)
+    summary, usage, stats = summarize_incrementally(job, model, model_choice, forums_text, sentiment_toggle, hint)
+    return {"llm_summary": summary, "usage": usage, "thread_count": len(forums_text), "partials": stats}
+
+def classification_checkpoint(model_choice, forums_comments, aspects):
+    return checkpoint_for("classify", model_choice, forums_comments, aspects)
+
+def run_classification_job(job, api_key, model_choice, forums_comments, aspects, allow_fallback=False):
+    """
+    Classify every comment's aspect and sentiment. Threads whose comments
+    were all labelled are checkpointed, so a rerun after a failure only calls
+    the LLM for the rest; the checkpoint is kept while any thread is incomplete.
+    With allow_fallback, calls move to a cheaper model while the chosen one is over quota.
+    """
+    checkpoint = classification_checkpoint(model_choice, forums_comments, aspects)
+    model = make_model(api_key, model_choice, allow_fallback=allow_fallback)
+    results, unlabelled = classify_forums(job, model, forums_comments, aspects, checkpoint)
+    if unlabelled:
+        job.warn(f"{unlabelled} comments could not be classified; rerun to retry them")
+    else:
+        checkpoint.clear()
+    return {
+        "comment_aspect_sentiment": results,
+        "total_comments": sum(len(comments) for _, comments in forums_comments),
+    }
+
+# -------------------- Watchlist Monitoring --------------------
+def fetch_if_changed(driver, watch, url, reply_count=None):
+    """
+    (forum_text, probe_hash) of a watched thread, or None if it did not change.
+    With a reply count from the search listing the thread is only opened when
+    the count moved. Otherwise its first page is loaded and hashed together
+    with its "see more replies" links, whose hidden-reply count moves when
+    replies are added beyond the first page; replies are only expanded when
+    that hash changed.
+    """
+    state = watch["threads"].get(url)
+    if reply_count is not None:
+        if not thread_changed(state, reply_count=reply_count):
+            return None
+        return scrape_thread(driver, url, see_more_rounds=WATCH_SEE_MORE_ROUNDS), None
+    text, see_more = probe_thread(driver, url)
+    probe_hash = text_hash(text + "\n" + see_more)
+    if not thread_changed(state, probe_hash=probe_hash):
+        return None
+    if see_more:
+        text = scrape_thread(driver, url, see_more_rounds=WATCH_SEE_MORE_ROUNDS)
+    return text, probe_hash
+
+def check_watch(job, watch, driver, model, stats):
+    """
+    One check of a watch (updated in place): list its threads, fetch the
+    changed ones, classify their new replies and record the results.
+    Returns an alert dict if sentiment shifted, else None.
+    """
+    before = watch_sentiments(watch)
+    batch = empty_counts()
+    if watch["kind"] == KEYWORD:
+        page_source = load_search_results(driver, build_search_url(watch["target"], watch["sort_option"]),
+                                          watch["max_posts"])
+        listing = parse_search_listing(page_source, watch["max_posts"])
+    else:
+        listing = [{"url": watch["target"], "reply_count": None}]
+
+    fetched = []
+    for entry in listing:
+        job.update()
+        stats["threads"] += 1
+        result = fetch_if_changed(driver, watch, entry["url"], entry["reply_count"])
+        if result is None:
+            continue
+        stats["fetched"] += 1
+        text, probe_hash = result
+        title, n_comments, new_comments = unseen_comments(watch, entry["url"], text)
+        fetched.append((entry["url"], entry["reply_count"], probe_hash, title, n_comments, new_comments))
+        polite_pause()
+
+    forums_comments = [(title, new_comments) for _, _, _, title, _, new_comments in fetched]
+    if watch["aspects"] is None and any(comments for _, comments in forums_comments):
+        # Aspects are fixed on the first check so later counts stay comparable
+        from pantip_listener.aspects import discover_forum_aspects, aspect_names
+
+        discovered = discover_forum_aspects(forums_comments)
+        watch["aspects"] = aspect_names(discovered) if discovered else [UNCLASSIFIED_ASPECT]
+
+    for url, reply_count, probe_hash, title, n_comments, new_comments in fetched:
+        job.update()
+        positions = sample_positions(len(new_comments), MAX_NEW_COMMENTS)
+        picked = [new_comments[i] for i in positions]
+        labels = classify_forum_comments(title, picked, watch["aspects"], model) if picked else {}
+        if picked and not labels:
+            raise RuntimeError(f"No comments of {url} could be classified")
+        # Only advance past the replies before the first one left unlabelled; the rest is retried next check
+        done = next((i for i in range(1, len(picked) + 1) if i not in labels), None)
+        if done is None:
+            seen, labelled = n_comments, [(picked[i - 1], *labels[i]) for i in sorted(labels)]
+        else:
+            seen = n_comments - len(new_comments) + positions[done - 1]
+            labelled = [(picked[i - 1], *labels[i]) for i in range(1, done)]
+        batch = add_counts(batch, record_thread(watch, url, title, seen, labelled, reply_count, probe_hash,
+                                                complete=done is None))
+        stats["new_comments"] += len(labelled)
+    watch["last_error"] = None
+    return finish_check(watch, before, batch)
+
+def run_watch_job(job, api_key, model_choice, watch_ids, allow_fallback=False):
+    """
+    Check the given watches with one Chrome driver. Only threads whose listed
+    reply count or first page changed are scraped, and only their new replies
+    are classified. A failing watch is logged and retried at its next interval.
+    """
+    watchlist = get_watchlist()
+    model = make_model(api_key, model_choice, allow_fallback=allow_fallback)
+    stats = {"watches": 0, "threads": 0, "fetched": 0, "new_comments": 0, "alerts": 0}
+    driver = None
+    try:
+        for i, watch_id in enumerate(watch_ids):
+            watch = watchlist.checkout(watch_id)
+            if watch is None:
+                continue
+            job.update(i / len(watch_ids), f"📡 กำลังตรวจ {watch['target']} ({i+1}/{len(watch_ids)})")
+            try:
+                if driver is None:
+                    driver = create_driver()
+                alert = check_watch(job, watch, driver, model, stats)
+            except JobCancelled:
+                raise
+            except Exception as e:
+                job.warn(f"Error checking {watch['target']}: {e}")
+                watch["last_error"] = str(e)
+                alert = finish_check(watch, watch_sentiments(watch), empty_counts())
+                if driver is not None and not driver_alive(driver):
+                    # Chrome crashed: the next watch starts a fresh driver
+                    quit_driver(driver)
+                    driver = None
+            watchlist.commit(watch)
+            stats["watches"] += 1
+            if alert:
+                watchlist.add_alert(alert)
+                stats["alerts"] += 1
+        return stats
+    finally:
+        if driver is not None:
+            quit_driver(driver)
@@ -0,0 +1,126 @@
+"""
+Cost-bounded comment sampling for searches with very large threads.
+
+A per-run comment budget is split across threads in proportion to the
+square root of their full reply count (big threads get more, but every
+thread keeps a share), and each thread's quota is spread evenly over the
+replies that were loaded. Threads stop expanding "see more replies" early,
+so for large threads those are the earliest replies, not the whole thread.
+"""
+import math
+
+from pantip_listener.scraping import TOTAL_REPLIES_LABEL
+
+MIN_COMMENTS_PER_THREAD = 5
+# Threads stop expanding "see more" once they show this many times their fair share
+EXPANSION_FACTOR = 2
+
+def expansion_limit(budget, n_threads):
+    """
+    Replies worth loading per thread before its quota is surely met.
+    """
+    if not budget or not n_threads:
+        return None
+    return max(MIN_COMMENTS_PER_THREAD, math.ceil(budget / n_threads) * EXPANSION_FACTOR)
+
+def allocate_quotas(sizes, budget, min_per_thread=MIN_COMMENTS_PER_THREAD, available=None):
+    """
+    Split budget comments across threads of the given sizes.
+    available (default: sizes) is how many comments of each thread can be
+    kept; a quota never exceeds it.
+    Each thread gets at least min(available, min_per_thread), lowered to an
+    even share of the budget when that is smaller so the total never exceeds
+    it; the rest follows sqrt(size) with largest-remainder rounding.
+    """
+    available = list(sizes) if available is None else list(available)
+    if sum(available) <= budget:
+        return available
+    min_per_thread = min(min_per_thread, budget // len(sizes))
+    quotas = [min(n, min_per_thread) for n in available]
+    remaining = budget - sum(quotas)
+    while remaining > 0:
+        open_threads = [i for i, n in enumerate(available) if quotas[i] < n]
+        if not open_threads:
+            break
+        weights = {i: math.sqrt(sizes[i]) for i in open_threads}
+        total = sum(weights.values())
+        shares = {i: remaining * w / total for i, w in weights.items()}
+        given = 0
+        for i in open_threads:
+            extra = min(int(shares[i]), available[i] - quotas[i])
+            quotas[i] += extra
+            given += extra
+        if given == 0:
+            # Hand out the leftover one by one, largest remainder first
+            for i in sorted(open_threads, key=lambda i: shares[i] - int(shares[i]), reverse=True):
+                if given == remaining:
+                    break
+                quotas[i] += 1
+                given += 1
+        remaining -= given
+    return quotas
+
+def sample_positions(n, k):
+    """
+    k of n positions, one from the middle of each of k equal position strata.
+    """
+    if k >= n:
+        return list(range(n))
+    return [int((i + 0.5) * n / k) for i in range(k)]
+
+def split_forum_text(forum_text):
+    """
+    (header lines, comment lines) of a forum text block.
+    """
+    lines = forum_text.split("\n")
+    header = [line for line in lines if not line.startswith("คอมเมนต์ที่")]
+    comments = [line for line in lines if line.startswith("คอมเมนต์ที่")]
+    return header, comments
+
+def thread_size(header, comments):
+    """
+    Full reply count of a thread: the count stated in its header when
+    replies were left unloaded, else the number of comments loaded.
+    """
+    for line in header:
+        if line.startswith(TOTAL_REPLIES_LABEL):
+            return max(len(comments), int(line[len(TOTAL_REPLIES_LABEL):]))
+    return len(comments)
+
+def sample_forums(forums_text, budget):
+    """
+    Keep at most budget comments over all threads (every thread keeps at
+    least a few when the budget allows), allocated by each thread's full
+    reply count. Comments keep their original numbers, so sampled output
+    still points at the real reply.
+    Returns (sampled_forums_text, info) where info has kept/collected/total counts.
+    """
+    split = [split_forum_text(text) for text in forums_text]
+    loaded = [len(comments) for _, comments in split]
+    sizes = [thread_size(header, comments) for header, comments in split]
+    quotas = allocate_quotas(sizes, budget, available=loaded)
+    sampled = []
+    for (header, comments), quota in zip(split, quotas):
+        kept = [comments[i] for i in sample_positions(len(comments), quota)]
+        sampled.append("\n".join(header + kept))
+    info = {
+        "budget": budget,
+        "kept": sum(quotas),
+        "collected": sum(loaded),
+        "total": sum(sizes),
+        "threads": len(forums_text),
+    }
+    return sampled, info
+
+def sample_fraction_text(info):
+    """
+    Short Thai description of a sample, e.g. for captions next to results.
+    """
+    if not info or not info["collected"]:
+        return ""
+    total = info.get("total", info["collected"])
+    text = (f"🎯 ใช้คอมเมนต์ตัวอย่าง {info['kept']:,}/{total:,} คอมเมนต์ทั้งหมด "
+            f"({info['kept'] / total:.0%}) จาก {info['threads']} กระทู้")
+    if total > info["collected"]:
+        text += f" (ดึงมาเพียง {info['collected']:,} คอมเมนต์แรกๆ)"
+    return text
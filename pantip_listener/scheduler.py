@@ -0,0 +1,246 @@
+"""
+Quota-aware scheduler shared by every Gemini call on the server.
+
+Requests are queued per API key and released only while the key's
+requests-per-minute and tokens-per-minute budgets allow it. 429 and 5xx
+errors are retried with jittered exponential backoff (and pause the whole
+key), and classification calls may fall back to a cheaper model when the
+chosen one is over budget.
+"""
+import os
+import time
+import random
+import threading
+from collections import deque, defaultdict
+
+# Model choices, most capable (and most expensive) first
+MODEL_OPTIONS = [
+    "gemini-2.5-pro",
+    "gemini-2.5-flash",
+    "gemini-2.5-flash-lite-preview-06-17",
+    "gemini-2.0-flash",
+    "gemini-2.0-flash-lite",
+]
+
+# (requests per minute, tokens per minute) per key, roughly the free-tier quotas
+DEFAULT_LIMITS = {
+    "gemini-2.5-pro": (5, 250_000),
+    "gemini-2.5-flash": (10, 250_000),
+    "gemini-2.5-flash-lite-preview-06-17": (15, 250_000),
+    "gemini-2.0-flash": (15, 1_000_000),
+    "gemini-2.0-flash-lite": (30, 1_000_000),
+}
+
+# Multiply every budget, e.g. PANTIP_QUOTA_SCALE=100 for a paid tier key
+QUOTA_SCALE = float(os.environ.get("PANTIP_QUOTA_SCALE", "1"))
+
+RETRYABLE_CODES = (429, 500, 502, 503, 504)
+WINDOW_SECONDS = 60.0
+
+def estimate_tokens(prompt):
+    """
+    Rough token count for budgeting; Thai text averages about 3 characters per token.
+    """
+    return len(str(prompt)) // 3 + 1
+
+def is_retryable(error):
+    """
+    True for rate-limit and server errors (google.api_core errors carry an HTTP code).
+    """
+    code = getattr(error, "code", None)
+    if isinstance(code, int) and code in RETRYABLE_CODES:
+        return True
+    text = str(error)
+    return "429" in text or "Resource has been exhausted" in text
+
+def fallback_models(model_name):
+    """
+    Cheaper models after model_name in MODEL_OPTIONS.
+    """
+    if model_name not in MODEL_OPTIONS:
+        return []
+    return MODEL_OPTIONS[MODEL_OPTIONS.index(model_name) + 1:]
+
+class QuotaWindow:
+    """
+    Sliding one-minute window of requests and tokens for one (key, model).
+    """
+
+    def __init__(self, rpm, tpm):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.events = deque()
+        self.blocked_until = 0.0
+
+    def _trim(self, now):
+        while self.events and self.events[0][0] <= now - WINDOW_SECONDS:
+            self.events.popleft()
+
+    def used(self, now):
+        self._trim(now)
+        return len(self.events), sum(tokens for _, tokens in self.events)
+
+    def wait_time(self, tokens, now):
+        """
+        Seconds until a request of this many tokens fits the budget.
+        """
+        self._trim(now)
+        wait = max(0.0, self.blocked_until - now)
+        if len(self.events) >= self.rpm:
+            wait = max(wait, self.events[0][0] + WINDOW_SECONDS - now)
+        used_tokens = sum(t for _, t in self.events)
+        if self.events and used_tokens + tokens > self.tpm:
+            # Wait until enough of the oldest requests leave the window
+            freed = 0
+            for start, t in self.events:
+                freed += t
+                if used_tokens - freed + tokens <= self.tpm:
+                    wait = max(wait, start + WINDOW_SECONDS - now)
+                    break
+            else:
+                wait = max(wait, self.events[-1][0] + WINDOW_SECONDS - now)
+        return wait
+
+    def record(self, tokens, now):
+        event = [now, tokens]
+        self.events.append(event)
+        return event
+
+class KeyStats:
+    def __init__(self):
+        self.queued = 0
+        self.requests = 0
+        self.retries = 0
+        self.fallbacks = 0
+        self.throttled = 0
+        self.throttle_seconds = 0.0
+
+class ScheduledModel:
+    """
+    GenerativeModel look-alike whose calls go through the scheduler.
+    """
+
+    def __init__(self, scheduler, api_key, model_name, allow_fallback=False):
+        self.scheduler = scheduler
+        self.api_key = api_key
+        self.model_name = model_name
+        self.allow_fallback = allow_fallback
+
+    def generate_content(self, prompt, **kwargs):
+        fallbacks = fallback_models(self.model_name) if self.allow_fallback else []
+        return self.scheduler.generate(self.api_key, self.model_name, prompt, fallbacks, **kwargs)
+
+class GeminiScheduler:
+    """
+    Per-key RPM/TPM budgets, queueing, retry with backoff and model fallback.
+    model_factory(api_key, model_name) builds the underlying model, so a local
+    fake can stand in for Gemini.
+    """
+
+    def __init__(self, model_factory, limits=None, max_retries=4, backoff_base=2.0, backoff_max=60.0):
+        self.model_factory = model_factory
+        self.limits = dict(DEFAULT_LIMITS, **(limits or {}))
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._cond = threading.Condition()
+        self._windows = {}
+        self._models = {}
+        self._stats = defaultdict(KeyStats)
+
+    def model(self, api_key, model_name, allow_fallback=False):
+        return ScheduledModel(self, api_key, model_name, allow_fallback)
+
+    def _window(self, api_key, model_name):
+        key = (api_key, model_name)
+        if key not in self._windows:
+            rpm, tpm = self.limits.get(model_name, (10, 250_000))
+            self._windows[key] = QuotaWindow(max(1, int(rpm * QUOTA_SCALE)), max(1, int(tpm * QUOTA_SCALE)))
+        return self._windows[key]
+
+    def _client(self, api_key, model_name):
+        key = (api_key, model_name)
+        with self._cond:
+            client = self._models.get(key)
+        if client is None:
+            client = self.model_factory(api_key, model_name)
+            with self._cond:
+                self._models[key] = client
+        return client
+
+    def _acquire(self, api_key, candidates, tokens):
+        """
+        Block until one of the candidate models has budget; returns the model
+        name and its recorded window event.
+        """
+        with self._cond:
+            stats = self._stats[api_key]
+            stats.queued += 1
+            waited = False
+            try:
+                while True:
+                    now = time.monotonic()
+                    waits = []
+                    for name in candidates:
+                        window = self._window(api_key, name)
+                        wait = window.wait_time(tokens, now)
+                        if wait <= 0:
+                            return name, window.record(tokens, now)
+                        waits.append(wait)
+                    if not waited:
+                        stats.throttled += 1
+                        waited = True
+                    self._cond.wait(timeout=min(waits))
+                    stats.throttle_seconds += time.monotonic() - now
+            finally:
+                stats.queued -= 1
+
+    def generate(self, api_key, model_name, prompt, fallbacks=(), **kwargs):
+        candidates = [model_name, *fallbacks]
+        tokens = estimate_tokens(prompt)
+        for attempt in range(self.max_retries + 1):
+            chosen, event = self._acquire(api_key, candidates, tokens)
+            try:
+                response = self._client(api_key, chosen).generate_content(prompt, **kwargs)
+            except Exception as e:
+                if not is_retryable(e) or attempt == self.max_retries:
+                    raise
+                delay = min(self.backoff_max, self.backoff_base * 2 ** attempt) * random.uniform(0.5, 1.5)
+                with self._cond:
+                    window = self._window(api_key, chosen)
+                    window.blocked_until = max(window.blocked_until, time.monotonic() + delay)
+                    self._stats[api_key].retries += 1
+                continue
+            usage = getattr(response, "usage_metadata", None)
+            with self._cond:
+                stats = self._stats[api_key]
+                stats.requests += 1
+                if chosen != model_name:
+                    stats.fallbacks += 1
+                if usage is not None:
+                    event[1] = usage.total_token_count
+                self._cond.notify_all()
+            return response
+
+    def stats(self, api_key, model_name=None):
+        """
+        Snapshot of queue depth, throttling and usage for one key.
+        """
+        with self._cond:
+            s = self._stats[api_key]
+            snapshot = {
+                "queued": s.queued,
+                "requests": s.requests,
+                "retries": s.retries,
+                "fallbacks": s.fallbacks,
+                "throttled": s.throttled,
+                "throttle_seconds": s.throttle_seconds,
+            }
+            if model_name:
+                window = self._window(api_key, model_name)
+                used_requests, used_tokens = window.used(time.monotonic())
+                snapshot.update({
+                    "rpm_used": used_requests, "rpm_limit": window.rpm,
+                    "tpm_used": used_tokens, "tpm_limit": window.tpm,
+                })
+            return snapshot
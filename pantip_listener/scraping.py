@@ -0,0 +1,274 @@
+import re
+import time
+import random
+import urllib.parse
+from datetime import datetime
+
+# Selenium and BeautifulSoup are imported inside the functions that use them,
+# so pages that only build URLs don't pay for loading them on every server start.
+
+SEARCH_RESULT_SELECTOR = "li.pt-list-item h2 a"
+SEARCH_DATE_SELECTOR = "li.pt-list-item .pt-sm-toggle-date-hide"
+SEARCH_ITEM_SELECTOR = "li.pt-list-item"
+# Reply count shown next to each search result, used to spot changed threads without opening them
+SEARCH_REPLY_COUNT_SELECTOR = ".pt-li_stats-comment"
+SEE_MORE_SELECTOR = "a.reply.see-more"
+POST_STORY_CLASS = "display-post-story"
+# Header line giving a thread's full reply count when some replies were not loaded
+TOTAL_REPLIES_LABEL = "ความเห็นทั้งหมด : "
+
+# Politeness delay (seconds) between thread requests; benchmarks set it to (0, 0)
+THREAD_DELAY = (1, 2)
+# Waits (seconds) after each "see more" click and for expanded replies to finish rendering
+CLICK_DELAY = 0.1
+SETTLE_DELAY = 1
+
+# -------------------- Search URL --------------------
+SORT_OPTIONS = ["เกี่ยวข้องมากที่สุด", "กระทู้ใหม่ที่สุด"]
+# Results load_search_results can load with its scrolls; pages cap "max posts" inputs at this
+MAX_SEARCH_POSTS = 30
+
+def build_search_url(keyword, sort_option):
+    """
+    Build the Pantip search URL for a keyword and one of SORT_OPTIONS.
+    """
+    keyword_encoded = urllib.parse.quote_plus(keyword)
+    if sort_option == SORT_OPTIONS[1]:
+        return f"https://pantip.com/search?q={keyword_encoded}&timebias=true"
+    return f"https://pantip.com/search?q={keyword_encoded}"
+
+def parse_thai_date(date_str):
+    """
+    Parse Thai date string like '21 มิ.ย. 67' to datetime object.
+    Returns None if parsing fails.
+    """
+    try:
+        thai_months = {
+            'ม.ค.': 1, 'ก.พ.': 2, 'มี.ค.': 3, 'เม.ย.': 4, 'พ.ค.': 5, 'มิ.ย.': 6,
+            'ก.ค.': 7, 'ส.ค.': 8, 'ก.ย.': 9, 'ต.ค.': 10, 'พ.ย.': 11, 'ธ.ค.': 12
+        }
+        parts = date_str.strip().split()
+        if len(parts) != 3:
+            return None
+        day = int(parts[0])
+        month = thai_months.get(parts[1])
+        year = int(parts[2])
+        if year < 100:
+            year += 2500
+        year -= 543
+        if month is None:
+            return None
+        return datetime(year, month, day)
+    except Exception:
+        return None
+
+# -------------------- Selenium Driver --------------------
+def create_driver():
+    """
+    Start a headless Chrome driver tuned for scraping.
+    """
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--disable-logging")
+    chrome_options.add_argument("--log-level=3")
+    chrome_options.add_argument("--disable-extensions")
+    chrome_options.add_argument("--disable-web-security")
+    chrome_options.add_argument("--disable-images")
+    chrome_options.add_argument("--disable-plugins")
+    chrome_options.add_argument("--disable-software-rasterizer")
+    chrome_options.add_argument("--disable-background-timer-throttling")
+    chrome_options.add_argument("--disable-backgrounding-occluded-windows")
+    chrome_options.add_argument("--disable-renderer-backgrounding")
+    return webdriver.Chrome(options=chrome_options)
+
+def driver_alive(driver):
+    """
+    Whether the browser session still answers; False after Chrome crashed.
+    """
+    try:
+        driver.current_url
+        return True
+    except Exception:
+        return False
+
+def quit_driver(driver):
+    """
+    Close a driver, ignoring errors from one whose browser already died.
+    """
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+# -------------------- Search Results --------------------
+def load_search_results(driver, search_url, max_posts, max_tries=10):
+    """
+    Open the search page and scroll until at least max_posts results are loaded.
+    Returns the page source.
+    """
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
+    driver.get(search_url)
+    WebDriverWait(driver, 10).until(
+        EC.presence_of_element_located((By.CSS_SELECTOR, SEARCH_RESULT_SELECTOR))
+    )
+    for _ in range(max_tries):
+        threads = driver.find_elements(By.CSS_SELECTOR, SEARCH_RESULT_SELECTOR)
+        if len(threads) >= max_posts:
+            break
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        time.sleep(1)
+    return driver.page_source
+
+def parse_search_results(page_source, max_posts, date_filter=None):
+    """
+    Extract thread URLs from a search results page.
+    If date_filter is given, only threads posted on or after it are kept.
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(page_source, "html.parser")
+    threads = soup.select(SEARCH_RESULT_SELECTOR)[:max_posts]
+    thread_urls = [t['href'] if t['href'].startswith("http") else "https://pantip.com" + t['href'] for t in threads]
+    if date_filter:
+        filtered_urls = []
+        date_elements = soup.select(SEARCH_DATE_SELECTOR)
+        for i, url in enumerate(thread_urls):
+            if i < len(date_elements):
+                date_str = date_elements[i].get_text(strip=True)
+                post_date = parse_thai_date(date_str)
+                if post_date and post_date.date() >= date_filter:
+                    filtered_urls.append(url)
+        thread_urls = filtered_urls
+    return thread_urls
+
+def parse_search_listing(page_source, max_posts):
+    """
+    Threads on a search results page as {url, title, reply_count} dicts.
+    reply_count is None when the listing does not show it.
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(page_source, "html.parser")
+    listing = []
+    for item in soup.select(SEARCH_ITEM_SELECTOR):
+        link = item.select_one("h2 a")
+        if link is None:
+            continue
+        href = link["href"]
+        count = item.select_one(SEARCH_REPLY_COUNT_SELECTOR)
+        digits = re.sub(r"\D", "", count.get_text()) if count else ""
+        listing.append({
+            "url": href if href.startswith("http") else "https://pantip.com" + href,
+            "title": link.get_text(strip=True),
+            "reply_count": int(digits) if digits else None,
+        })
+        if len(listing) >= max_posts:
+            break
+    return listing
+
+# -------------------- Thread Pages --------------------
+def hidden_replies(see_more_texts):
+    """
+    Replies still hidden behind "see more replies" links, from the count each link shows.
+    """
+    hidden = 0
+    for text in see_more_texts:
+        digits = re.findall(r"\d+", text.replace(",", ""))
+        if digits:
+            hidden += int(digits[-1])
+    return hidden
+
+def parse_thread_page(page_source):
+    """
+    Convert a thread page into the forum text format used throughout the app:
+    a 'หัวข้อ : ' line, a 'เนื้อหา : ' line, then one 'คอมเมนต์ที่ N : ' line per reply.
+    If "see more" links still hide replies, a 'ความเห็นทั้งหมด : N' line
+    after the opening post gives the thread's full reply count.
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(page_source, "html.parser")
+    header = soup.find("h2", {"class": "display-post-title"})
+    forum_texts = []
+    if header:
+        forum_texts.append(f"หัวข้อ : {header.text}")
+    comments = soup.find_all("div", {"class": POST_STORY_CLASS})
+    for idx, comment in enumerate(comments, start=0):
+        text = comment.get_text(separator=" ", strip=True)
+        text = re.sub(r'\s+', ' ', text)
+        label = f"เนื้อหา : {text}" if idx == 0 else f"คอมเมนต์ที่ {idx} : {text}"
+        forum_texts.append(label)
+        if idx == 0:
+            hidden = hidden_replies(link.get_text() for link in soup.select(SEE_MORE_SELECTOR))
+            if hidden:
+                forum_texts.append(f"{TOTAL_REPLIES_LABEL}{len(comments) - 1 + hidden}")
+    return "\n".join(forum_texts)
+
+def scrape_thread(driver, url, see_more_rounds=3, max_comments=None):
+    """
+    Open a thread, expand "see more replies" and return its forum text.
+    With max_comments, expanding stops once that many replies are shown.
+    """
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
+    driver.get(url)
+    WebDriverWait(driver, 10).until(
+        EC.presence_of_element_located((By.CLASS_NAME, POST_STORY_CLASS))
+    )
+    # Click all "see more replies" buttons
+    for _ in range(see_more_rounds):
+        if max_comments and len(driver.find_elements(By.CLASS_NAME, POST_STORY_CLASS)) > max_comments:
+            break
+        see_more_buttons = driver.find_elements(By.CSS_SELECTOR, SEE_MORE_SELECTOR)
+        if not see_more_buttons:
+            break
+        for btn in see_more_buttons:
+            driver.execute_script("arguments[0].click();", btn)
+            if CLICK_DELAY:
+                time.sleep(CLICK_DELAY)
+    try:
+        WebDriverWait(driver, 5).until(
+            lambda d: len(d.find_elements(By.CLASS_NAME, POST_STORY_CLASS)) > 1
+        )
+    except Exception:
+        pass
+    if SETTLE_DELAY:
+        time.sleep(SETTLE_DELAY)
+    return parse_thread_page(driver.page_source)
+
+def probe_thread(driver, url):
+    """
+    Open a thread without expanding replies, for change detection.
+    Returns (forum_text, see_more) where see_more is the text of the "see
+    more replies" links, which state how many replies are still hidden; it
+    is empty when the text holds the whole thread.
+    """
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
+    driver.get(url)
+    WebDriverWait(driver, 10).until(
+        EC.presence_of_element_located((By.CLASS_NAME, POST_STORY_CLASS))
+    )
+    see_more = " ".join(link.text.strip() for link in driver.find_elements(By.CSS_SELECTOR, SEE_MORE_SELECTOR))
+    return parse_thread_page(driver.page_source), see_more
+
+def polite_pause():
+    """
+    Sleep between thread requests so Pantip is not hammered.
+    """
+    low, high = THREAD_DELAY
+    if high:
+        time.sleep(0.7 + random.uniform(low, high))
@@ -0,0 +1,226 @@
+"""
+Memory-bounded store for per-session data such as scraped threads and
+classification results.
+
+Each payload is kept once, JSON-encoded and zlib-compressed; session state
+only holds its reference id. Large payloads go straight to disk, the least
+recently used ones are spilled to disk when the memory cap is reached, and
+data of sessions idle for longer than the TTL is deleted. Spill files left
+by an earlier server process are removed when the store is created. A few
+decoded payloads are kept for page reruns; they count against the same
+memory cap and are dropped first.
+"""
+import os
+import json
+import time
+import zlib
+import uuid
+import threading
+from collections import OrderedDict
+
+from pantip_listener.config import DATA_DIR
+
+SPILL_DIR = os.path.join(DATA_DIR, "spill")
+MEMORY_CAP_BYTES = int(float(os.environ.get("PANTIP_STORE_MEMORY_MB", "256")) * 1024 * 1024)
+SPILL_THRESHOLD_BYTES = 4 * 1024 * 1024
+SESSION_TTL_SECONDS = int(float(os.environ.get("PANTIP_SESSION_TTL_HOURS", "6")) * 60 * 60)
+# Decoded payloads kept across reruns (large ones are a few MB each)
+DECODED_ENTRIES = 16
+
+class _Entry:
+    def __init__(self, session_id, blob, size):
+        self.session_id = session_id
+        self.blob = blob
+        self.size = size
+        self.path = None
+        self.last_access = time.time()
+
+class SessionStore:
+    """
+    Compressed payloads keyed by reference id, with disk spill and idle eviction.
+    """
+
+    def __init__(self, memory_cap=MEMORY_CAP_BYTES, spill_dir=SPILL_DIR,
+                 spill_threshold=SPILL_THRESHOLD_BYTES, session_ttl=SESSION_TTL_SECONDS,
+                 decoded_entries=DECODED_ENTRIES):
+        self.memory_cap = memory_cap
+        self.spill_dir = spill_dir
+        self.spill_threshold = spill_threshold
+        self.session_ttl = session_ttl
+        self.decoded_entries = decoded_entries
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._sessions = {}
+        self._memory = 0
+        # ref -> (decoded value, size of its JSON), least recently used first
+        self._decoded = OrderedDict()
+        self._decoded_memory = 0
+        self._clear_spill_dir()
+
+    def put(self, session_id, value):
+        """
+        Store value for session_id and return its reference id.
+        """
+        blob = zlib.compress(json.dumps(value, ensure_ascii=False).encode("utf-8"), 6)
+        ref = uuid.uuid4().hex
+        entry = _Entry(session_id, blob, len(blob))
+        with self._lock:
+            self._entries[ref] = entry
+            self._sessions[session_id] = entry.last_access
+            if entry.size > self.spill_threshold:
+                self._spill(ref, entry)
+            else:
+                self._memory += entry.size
+            self._enforce_limits()
+        return ref
+
+    def get(self, ref, default=None):
+        """
+        Decoded value for ref, or default if it was deleted or evicted.
+        """
+        raw = self._read(ref)
+        if raw is None:
+            return default
+        return json.loads(raw)
+
+    def get_decoded(self, ref, default=None):
+        """
+        Like get, but the decoded value is kept for the next call and shared
+        by every caller, so it must be treated as read-only. Kept values are
+        dropped when the ref is deleted or memory runs short.
+        """
+        with self._lock:
+            hit = self._decoded.get(ref)
+            if hit is not None:
+                self._decoded.move_to_end(ref)
+                self._mark_access(self._entries[ref])
+                return hit[0]
+        raw = self._read(ref)
+        if raw is None:
+            return default
+        value = json.loads(raw)
+        with self._lock:
+            if ref in self._entries and ref not in self._decoded:
+                self._decoded[ref] = (value, len(raw))
+                self._decoded_memory += len(raw)
+                while len(self._decoded) > self.decoded_entries:
+                    self._forget_decoded(next(iter(self._decoded)))
+                self._enforce_limits()
+        return value
+
+    def _read(self, ref):
+        # JSON text of ref's payload, or None if it is gone
+        with self._lock:
+            entry = self._entries.get(ref)
+            if entry is None:
+                return None
+            self._mark_access(entry)
+            blob, path = entry.blob, entry.path
+        if blob is None:
+            try:
+                with open(path, "rb") as f:
+                    blob = f.read()
+            except OSError:
+                return None
+        return zlib.decompress(blob).decode("utf-8")
+
+    def _mark_access(self, entry):
+        now = time.time()
+        entry.last_access = now
+        self._sessions[entry.session_id] = now
+
+    def delete(self, ref):
+        with self._lock:
+            entry = self._entries.pop(ref, None)
+            if entry is not None:
+                self._drop(entry)
+            self._forget_decoded(ref)
+
+    def touch_session(self, session_id):
+        with self._lock:
+            self._sessions[session_id] = time.time()
+            self._enforce_limits()
+
+    def _clear_spill_dir(self):
+        # Spill files of an earlier process (restarted or crashed) can't be reached: their ids died with it
+        try:
+            names = os.listdir(self.spill_dir)
+        except OSError:
+            return
+        for name in names:
+            if name.endswith(".z"):
+                try:
+                    os.remove(os.path.join(self.spill_dir, name))
+                except OSError:
+                    pass
+
+    def _spill(self, ref, entry):
+        os.makedirs(self.spill_dir, exist_ok=True)
+        entry.path = os.path.join(self.spill_dir, f"{ref}.z")
+        with open(entry.path, "wb") as f:
+            f.write(entry.blob)
+        entry.blob = None
+
+    def _forget_decoded(self, ref):
+        hit = self._decoded.pop(ref, None)
+        if hit is not None:
+            self._decoded_memory -= hit[1]
+
+    def _drop(self, entry):
+        if entry.blob is not None:
+            self._memory -= entry.size
+        elif entry.path:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    def _enforce_limits(self):
+        # Forget sessions that have been idle for too long
+        cutoff = time.time() - self.session_ttl
+        idle = {sid for sid, last in self._sessions.items() if last < cutoff}
+        if idle:
+            for ref in [r for r, e in self._entries.items() if e.session_id in idle]:
+                self._drop(self._entries.pop(ref))
+                self._forget_decoded(ref)
+            for sid in idle:
+                del self._sessions[sid]
+        # Decoded copies are cheapest to give up: drop them first
+        while self._decoded and self._memory + self._decoded_memory > self.memory_cap:
+            self._forget_decoded(next(iter(self._decoded)))
+        # Spill least recently used payloads until under the memory cap
+        if self._memory > self.memory_cap:
+            in_memory = sorted(
+                ((r, e) for r, e in self._entries.items() if e.blob is not None),
+                key=lambda item: item[1].last_access
+            )
+            for ref, entry in in_memory:
+                if self._memory <= self.memory_cap:
+                    break
+                self._memory -= entry.size
+                self._spill(ref, entry)
+
+    def stats(self):
+        with self._lock:
+            spilled = sum(1 for e in self._entries.values() if e.blob is None)
+            return {
+                "sessions": len(self._sessions),
+                "entries": len(self._entries),
+                "spilled": spilled,
+                "decoded": len(self._decoded),
+                "memory_bytes": self._memory + self._decoded_memory,
+                "memory_cap": self.memory_cap,
+            }
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    """
+    Process-wide SessionStore shared by every session and page.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SessionStore()
+        return _store
@@ -0,0 +1,170 @@
+"""
+Streamlit helpers shared by the pages: session data, background jobs and Gemini quota.
+"""
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from pantip_listener.jobs import get_runner, RUNNING, DONE, FAILED, CANCELLED
+from pantip_listener.pipeline import scheduler
+from pantip_listener.store import get_store
+
+STATUS_LABELS = {
+    "pending": "⏳ รอคิว",
+    RUNNING: "🏃 กำลังทำงาน",
+    DONE: "✅ เสร็จสิ้น",
+    FAILED: "❌ ล้มเหลว",
+    CANCELLED: "⏹️ ยกเลิกแล้ว",
+}
+
+# -------------------- Session Data --------------------
+def session_id():
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else "default"
+
+def save_session_data(name, value):
+    """
+    Keep value in the shared session store; session state only holds its id.
+    """
+    store = get_store()
+    old_ref = st.session_state.get(f"{name}_ref")
+    if old_ref:
+        store.delete(old_ref)
+    st.session_state[f"{name}_ref"] = store.put(session_id(), value) if value else None
+
+def keep_session_alive():
+    """
+    Mark this session's stored data as in use, so it is not evicted as idle
+    while the page is open but reads nothing from the store.
+    """
+    get_store().touch_session(session_id())
+
+def store_sidebar():
+    """
+    Sidebar view of the shared session store: sessions, payloads and memory use.
+    """
+    stats = get_store().stats()
+    st.sidebar.markdown("---\n## 💾 ข้อมูลบนเซิร์ฟเวอร์")
+    st.sidebar.caption(f"เซสชัน: {stats['sessions']} | ชุดข้อมูล: {stats['entries']} "
+                       f"(เก็บลงดิสก์ {stats['spilled']})  \n"
+                       f"หน่วยความจำ: {stats['memory_bytes'] / 2**20:.1f}/{stats['memory_cap'] / 2**20:.0f} MB")
+
+def session_data_ref(name):
+    """
+    Store reference of a session data entry; stable until the value is saved again.
+    """
+    return st.session_state.get(f"{name}_ref")
+
+def load_session_data(name, default=None):
+    """
+    Value saved with save_session_data, or default if missing or evicted.
+    The value is shared between reruns and must be treated as read-only.
+    """
+    ref = session_data_ref(name)
+    if not ref:
+        return default
+    return get_store().get_decoded(ref, default)
+
+# -------------------- Background Jobs --------------------
+def submit_job(session_key, kind, fn, *args, label="", dedupe_key=None, **kwargs):
+    """
+    Submit a job to the shared runner and remember its id under session_key.
+    With a dedupe_key, an identical job already running is joined instead.
+    """
+    runner = get_runner()
+    job_id = runner.submit(kind, fn, *args, label=label, dedupe_key=dedupe_key, **kwargs)
+    st.session_state[session_key] = job_id
+    st.session_state.pop(f"{session_key}_notice", None)
+    st.session_state.setdefault("job_ids", []).append(job_id)
+    job = runner.get(job_id)
+    if job is not None and job.watchers > 1:
+        st.info("🔗 มีงานเดียวกันกำลังทำงานอยู่ ระบบจะใช้ผลลัพธ์จากงานนั้น")
+    return job_id
+
+def job_running(session_key):
+    job_id = st.session_state.get(session_key)
+    job = get_runner().get(job_id) if job_id else None
+    return job is not None and not job.finished
+
+def job_status_panel(session_key, on_done, poll_seconds=2):
+    """
+    Show progress of the job stored under session_key, polling every poll_seconds.
+    When it finishes, on_done(job) copies results into session state and the
+    whole page reruns; errors and scrape warnings are kept as a notice.
+    """
+    @st.fragment(run_every=poll_seconds)
+    def panel():
+        runner = get_runner()
+        job_id = st.session_state.get(session_key)
+        job = runner.get(job_id) if job_id else None
+        if job is None:
+            notice = st.session_state.get(f"{session_key}_notice")
+            if notice:
+                level, text, warnings = notice
+                getattr(st, level)(text)
+                for warning in warnings:
+                    st.warning(warning)
+            return
+
+        if not job.finished:
+            st.progress(job.progress, text=f"{STATUS_LABELS[job.status]}: {job.message}")
+            if st.button("⏹️ ยกเลิกงาน", key=f"cancel_{job_id}"):
+                runner.cancel(job_id)
+                if not job.cancelled:
+                    # Other sessions still need this job; just stop following it
+                    st.session_state.pop(session_key, None)
+                    st.session_state[f"{session_key}_notice"] = ("warning", "⏹️ ยกเลิกงานแล้ว", [])
+                    st.rerun()
+            return
+
+        if job.status == DONE:
+            notice = on_done(job) or ("success", "✅ งานเสร็จสิ้น!")
+            # The page now owns the result; the last watcher frees the job's copy
+            runner.release(job_id)
+        elif job.status == CANCELLED:
+            notice = ("warning", "⏹️ ยกเลิกงานแล้ว")
+        else:
+            notice = ("error", f"❌ เกิดข้อผิดพลาด: {job.error}")
+        st.session_state[f"{session_key}_notice"] = (notice[0], notice[1], list(job.warnings))
+        st.session_state.pop(session_key, None)
+        st.rerun()
+
+    panel()
+
+def job_table_sidebar():
+    """
+    Sidebar list of this session's jobs with their status.
+    """
+    job_ids = st.session_state.get("job_ids", [])
+    runner = get_runner()
+    jobs = runner.list_jobs(job_ids)
+    # Few elements: each one has a fixed cost on every rerun
+    st.sidebar.markdown("---\n## 🗂️ งานเบื้องหลัง")
+    st.sidebar.caption(f"งานที่กำลังทำงานบนเซิร์ฟเวอร์: {runner.active_count()}"
+                       + ("" if jobs else "  \nยังไม่มีงาน"))
+    if jobs:
+        st.sidebar.markdown("\n".join(
+            f"- **{job.label or job.kind}** — {STATUS_LABELS[job.status]}"
+            + (f" ({job.progress:.0%})" if job.status == RUNNING else "")
+            for job in jobs[:5]
+        ))
+
+# -------------------- Gemini Quota --------------------
+def quota_sidebar(api_key, model_choice, poll_seconds=5):
+    """
+    Sidebar view of the Gemini scheduler for this key: queue depth,
+    time spent throttled, retries, fallbacks and the last minute's usage.
+    """
+    if not api_key:
+        return
+
+    @st.fragment(run_every=poll_seconds)
+    def panel():
+        stats = scheduler.stats(api_key, model_choice)
+        st.markdown("---\n## 📶 โควต้า Gemini")
+        st.caption(f"คำขอที่รอคิว: {stats['queued']} | รอโควต้ารวม {stats['throttle_seconds']:.1f} วินาที  \n"
+                   f"ลองใหม่ (429/5xx): {stats['retries']} ครั้ง | ใช้โมเดลสำรอง: {stats['fallbacks']} ครั้ง  \n"
+                   f"1 นาทีล่าสุด: {stats['rpm_used']}/{stats['rpm_limit']} requests, "
+                   f"{stats['tpm_used']:,}/{stats['tpm_limit']:,} tokens")
+
+    with st.sidebar:
+        panel()
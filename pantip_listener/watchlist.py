@@ -0,0 +1,285 @@
+"""
+Watchlist of keywords and threads that are checked again on a schedule.
+
+For every thread of a watch we keep the reply count last seen in the search
+listing (or a hash of the thread's first page and its "see more" links),
+how many of its comments were already classified and their sentiment
+counts. A check only opens
+threads whose count or hash moved and only classifies the replies added
+since, so hundreds of watched threads cost one listing page per keyword plus
+the threads that actually changed. When the new replies' sentiment differs
+sharply from the watch's history an alert is kept.
+"""
+import os
+import copy
+import time
+import uuid
+import threading
+
+from pantip_listener.config import DATA_DIR
+from pantip_listener.checkpoint import read_json, write_json
+from pantip_listener.analysis import SENTIMENTS, extract_all_comments_by_forum
+
+WATCH_DIR = os.path.join(DATA_DIR, "watchlist")
+
+KEYWORD = "keyword"
+THREAD = "thread"
+
+DEFAULT_INTERVAL_MINUTES = int(os.environ.get("PANTIP_WATCH_INTERVAL_MINUTES", "60"))
+# Thread watches that keep not changing are checked less often, up to this many intervals apart
+MAX_BACKOFF = 8
+# "See more replies" rounds when fetching a watched thread; new replies sit at its end
+WATCH_SEE_MORE_ROUNDS = 20
+# New replies classified per thread and check; beyond this they are sampled evenly
+MAX_NEW_COMMENTS = int(os.environ.get("PANTIP_WATCH_MAX_NEW_COMMENTS", "200"))
+# Share of a sentiment among new replies must move this many points from the history to raise an alert
+SHIFT_POINTS = float(os.environ.get("PANTIP_WATCH_SHIFT_POINTS", "15"))
+MIN_SHIFT_COMMENTS = 10
+HISTORY_POINTS = 200
+RECENT_COMMENTS = 20
+MAX_ALERTS = 100
+
+# -------------------- Sentiment Counts --------------------
+def empty_counts():
+    return {s: 0 for s in SENTIMENTS}
+
+def add_counts(total, counts):
+    return {s: total.get(s, 0) + counts.get(s, 0) for s in SENTIMENTS}
+
+def sentiment_shares(counts):
+    total = sum(counts.values())
+    return {s: counts.get(s, 0) / total if total else 0.0 for s in SENTIMENTS}
+
+def watch_sentiments(watch):
+    """
+    Sentiment counts of a watch over all aspects.
+    """
+    total = empty_counts()
+    for counts in watch["counts"].values():
+        total = add_counts(total, counts)
+    return total
+
+def detect_shift(before, batch, points=SHIFT_POINTS, min_comments=MIN_SHIFT_COMMENTS):
+    """
+    Largest move in sentiment share from the history (before) to a batch of
+    new replies, as (sentiment, share_before, share_in_batch). None if no
+    share moved by points percentage points or either side is too small.
+    """
+    if sum(before.values()) < min_comments or sum(batch.values()) < min_comments:
+        return None
+    old, new = sentiment_shares(before), sentiment_shares(batch)
+    sentiment = max(SENTIMENTS, key=lambda s: abs(new[s] - old[s]))
+    if abs(new[sentiment] - old[sentiment]) * 100 < points:
+        return None
+    return sentiment, old[sentiment], new[sentiment]
+
+# -------------------- Change Detection --------------------
+def thread_changed(state, reply_count=None, probe_hash=None):
+    """
+    Whether a watched thread must be fetched: it is new, or its listed reply
+    count (preferred) or first-page hash differs from the last check.
+    """
+    if state is None:
+        return True
+    if reply_count is not None:
+        return state.get("reply_count") != reply_count
+    return probe_hash is None or state.get("probe_hash") != probe_hash
+
+def unseen_comments(watch, url, forum_text):
+    """
+    (title, number of comments, comments not classified yet) of a fetched thread.
+    """
+    title, comments = extract_all_comments_by_forum([forum_text])[0]
+    seen = watch["threads"].get(url, {}).get("comments_seen", 0)
+    return title, len(comments), comments[seen:]
+
+def record_thread(watch, url, title, comments_seen, labelled, reply_count=None, probe_hash=None, complete=True,
+                  now=None):
+    """
+    Add a fetched thread's newly classified replies, given as (comment,
+    aspect, sentiment) tuples, to the watch and mark its first comments_seen
+    comments as done. Unless complete, the detection state is left as it
+    was so the thread is fetched again and the rest of its replies retried.
+    Returns the sentiment counts of those replies.
+    """
+    now = now or time.time()
+    state = watch["threads"].setdefault(url, {"counts": empty_counts(), "reply_count": None, "probe_hash": None})
+    batch = empty_counts()
+    for _, aspect, sentiment in labelled:
+        batch[sentiment] += 1
+        watch["counts"].setdefault(aspect, empty_counts())[sentiment] += 1
+    state.update({
+        "title": title,
+        "comments_seen": comments_seen,
+        "counts": add_counts(state["counts"], batch),
+        "last_changed": now,
+    })
+    if complete:
+        state.update({"reply_count": reply_count, "probe_hash": probe_hash})
+    recent = [{"title": title, "comment": c, "aspect": a, "sentiment": s} for c, a, s in labelled]
+    watch["recent"] = (recent + watch["recent"])[:RECENT_COMMENTS]
+    return batch
+
+def finish_check(watch, before, batch, now=None):
+    """
+    Close a check: add a history point, schedule the next check and return
+    an alert dict if the new replies shifted sentiment, else None.
+    """
+    now = now or time.time()
+    watch["last_checked"] = now
+    if watch["kind"] == THREAD:
+        watch["backoff"] = 1 if sum(batch.values()) else min(watch["backoff"] * 2, MAX_BACKOFF)
+    watch["next_due"] = now + watch["interval_minutes"] * 60 * watch["backoff"]
+    if not sum(batch.values()):
+        return None
+    point = {"at": now, "counts": watch_sentiments(watch), "new": dict(batch)}
+    watch["history"] = (watch["history"] + [point])[-HISTORY_POINTS:]
+    shift = detect_shift(before, batch)
+    if shift is None:
+        return None
+    sentiment, share_before, share_after = shift
+    return {
+        "at": now,
+        "watch_id": watch["id"],
+        "target": watch["target"],
+        "sentiment": sentiment,
+        "before": share_before,
+        "after": share_after,
+        "comments": sum(batch.values()),
+    }
+
+# -------------------- Persistent Watchlist --------------------
+class Watchlist:
+    """
+    Watches kept in memory and saved as one JSON file each, plus the alert log.
+    Stored watches are replaced, never modified: a check works on a copy from
+    checkout() and publishes it with commit(), so readers need no lock.
+    """
+
+    def __init__(self, root=WATCH_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+        self._watches = {}
+        self._alerts = read_json(os.path.join(root, "alerts.json")) or []
+        if os.path.isdir(root):
+            for name in os.listdir(root):
+                if name.startswith("watch-") and name.endswith(".json"):
+                    watch = read_json(os.path.join(root, name))
+                    if watch:
+                        self._watches[watch["id"]] = watch
+
+    def _path(self, watch_id):
+        return os.path.join(self.root, f"watch-{watch_id}.json")
+
+    def add(self, kind, target, sort_option=None, max_posts=20, interval_minutes=DEFAULT_INTERVAL_MINUTES,
+            aspects=None):
+        """
+        Watch a keyword's search results or a single thread URL; returns the watch id.
+        Without aspects, they are discovered from the first replies collected.
+        """
+        watch = {
+            "id": uuid.uuid4().hex[:12],
+            "kind": kind,
+            "target": target.strip(),
+            "sort_option": sort_option,
+            "max_posts": int(max_posts),
+            "interval_minutes": float(interval_minutes),
+            "aspects": list(aspects) if aspects else None,
+            "created_at": time.time(),
+            "last_checked": None,
+            "last_error": None,
+            "next_due": 0.0,
+            "backoff": 1,
+            "threads": {},
+            "counts": {},
+            "history": [],
+            "recent": [],
+        }
+        with self._lock:
+            self._watches[watch["id"]] = watch
+            write_json(self._path(watch["id"]), watch)
+        return watch["id"]
+
+    def remove(self, watch_id):
+        with self._lock:
+            self._watches.pop(watch_id, None)
+            try:
+                os.remove(self._path(watch_id))
+            except OSError:
+                pass
+
+    def get(self, watch_id):
+        """
+        Stored watch (read-only) or None.
+        """
+        with self._lock:
+            return self._watches.get(watch_id)
+
+    def list_watches(self):
+        """
+        Stored watches (read-only), oldest first.
+        """
+        with self._lock:
+            watches = list(self._watches.values())
+        return sorted(watches, key=lambda w: w["created_at"])
+
+    def checkout(self, watch_id):
+        """
+        Private copy of a watch to update during a check, or None if it was removed.
+        """
+        with self._lock:
+            watch = self._watches.get(watch_id)
+            return copy.deepcopy(watch) if watch is not None else None
+
+    def commit(self, watch):
+        """
+        Publish an updated watch; dropped if the watch was removed meanwhile.
+        """
+        with self._lock:
+            if watch["id"] not in self._watches:
+                return
+            self._watches[watch["id"]] = watch
+            write_json(self._path(watch["id"]), watch)
+
+    def due(self, now=None):
+        """
+        Ids of watches whose next check time has passed.
+        """
+        now = now or time.time()
+        return [w["id"] for w in self.list_watches() if w["next_due"] <= now]
+
+    def mark_due(self, watch_ids):
+        """
+        Check these watches on the monitor's next tick.
+        """
+        for watch_id in watch_ids:
+            watch = self.checkout(watch_id)
+            if watch is not None:
+                watch["next_due"] = 0.0
+                watch["backoff"] = 1
+                self.commit(watch)
+
+    def add_alert(self, alert):
+        with self._lock:
+            self._alerts = (self._alerts + [alert])[-MAX_ALERTS:]
+            write_json(os.path.join(self.root, "alerts.json"), self._alerts)
+
+    def alerts(self, limit=20):
+        """
+        Latest alerts, newest first.
+        """
+        with self._lock:
+            return list(reversed(self._alerts[-limit:]))
+
+_watchlist = None
+_watchlist_lock = threading.Lock()
+
+def get_watchlist():
+    """
+    Process-wide Watchlist shared by every session and the monitor.
+    """
+    global _watchlist
+    with _watchlist_lock:
+        if _watchlist is None:
+            _watchlist = Watchlist()
+        return _watchlist